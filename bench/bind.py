@@ -0,0 +1,42 @@
+'''measure the time needed to evaluate long chains of binds.
+Run with `python -m bench.bind`; the time per bind should not grow with the length of the chain.
+'''
+import time
+
+from amino import List, Nil
+
+from chiasma.io.compute import TmuxIO
+from chiasma.tmux import PureTmux
+
+
+def left(n: int) -> TmuxIO[int]:
+    io = TmuxIO.pure(0)
+    for i in range(n):
+        io = io.flat_map(lambda a: TmuxIO.pure(a + 1))
+    return io
+
+
+def right(n: int) -> TmuxIO[int]:
+    def step(a: int) -> TmuxIO[int]:
+        return TmuxIO.pure(a) if a >= n else TmuxIO.pure(a + 1).flat_map(step)
+    return TmuxIO.pure(0).flat_map(step)
+
+
+def measure(cons, n: int) -> float:
+    tmux = PureTmux(Nil, Nil, Nil)
+    start = time.perf_counter()
+    result = cons(n).unsafe(tmux)
+    duration = time.perf_counter() - start
+    assert result == n
+    return duration
+
+
+def main() -> None:
+    for name, cons in (('left', left), ('right', right)):
+        for n in List(1000, 10000, 100000):
+            duration = measure(cons, n)
+            print(f'{name:>5} {n:>7} binds: {duration:8.3f}s {duration / n * 1e6:6.2f}µs/bind')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,40 @@
+'''compare the pure `balance_sizes` with the numpy backend on layouts with many views.
+Run with `python -m bench.measure`; requires numpy.
+'''
+import time
+import random
+from typing import Callable
+
+from amino import List, Just, Nothing
+
+from chiasma.window.measure import balance_sizes, normalize_weights
+from chiasma.window.measure_numpy import balance_sizes_numpy
+
+
+def views(n: int) -> tuple:
+    mins = List(*[random.choice([0, 0.1, 2, 5]) for i in range(n)])
+    maxs = mins.map(lambda a: random.choice([Nothing, Just(a + random.choice([1, 3, 10.5, 40]))]))
+    minimized = List(*[random.random() < 0.1 for i in range(n)])
+    weights = normalize_weights(minimized.map(lambda a: 0 if a else random.choice([0.5, 1, 2])))
+    return mins, maxs, weights, minimized, n * 8
+
+
+def measure(f: Callable, args: tuple, runs: int) -> float:
+    start = time.perf_counter()
+    for i in range(runs):
+        f(*args)
+    return (time.perf_counter() - start) / runs
+
+
+def main() -> None:
+    random.seed(0)
+    for n in List(4, 16, 64, 256, 1024):
+        args = views(n)
+        pure = measure(balance_sizes, args, 20)
+        vectorized = measure(balance_sizes_numpy, args, 20)
+        identical = balance_sizes(*args) == balance_sizes_numpy(*args)
+        print(f'{n:>4} views: pure {pure * 1e3:8.3f}ms, numpy {vectorized * 1e3:8.3f}ms, identical: {identical}')
+
+
+if __name__ == '__main__':
+    main()
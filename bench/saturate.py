@@ -0,0 +1,55 @@
+'''compare the water-filling `saturate` with the previous iterative implementation on layouts with many views.
+Run with `python -m bench.saturate`.
+'''
+import time
+import random
+from typing import Callable
+
+from amino import List
+
+from chiasma.window.measure import saturate, normalize_weights
+
+
+def saturate_iterative(initial: List[float], max_s: List[float], initial_weights: List[float], total: float
+                       ) -> List[float]:
+    def loop(current: List[float], weights: List[float]) -> List[float]:
+        rest = total - sum(current)
+        unsat_weights = current.zip(max_s, weights).map3(lambda s, m, w: 0 if s >= m else w)
+        new_weights = normalize_weights(unsat_weights)
+        new = current.zip(max_s, new_weights).map3(lambda l, h, w: min(l + w * rest, h))
+        return (
+            new
+            if new == current or rest <= 0
+            else loop(new, new_weights)
+        )
+    return loop(initial, initial_weights)
+
+
+def views(n: int) -> tuple:
+    mins = List(*[random.choice([0, 2, 5]) for i in range(n)])
+    maxs = mins.map(lambda a: a + random.choice([1, 3, 10, 40, 1e7]))
+    weights = normalize_weights(List(*[random.randint(1, 5) for i in range(n)]))
+    total = sum(mins) + n * 8
+    return mins, maxs, weights, total
+
+
+def measure(f: Callable, args: tuple, runs: int) -> float:
+    start = time.perf_counter()
+    for i in range(runs):
+        f(*args)
+    return (time.perf_counter() - start) / runs
+
+
+def main() -> None:
+    random.seed(0)
+    for n in List(10, 100, 300, 900):
+        args = views(n)
+        iterative = measure(saturate_iterative, args, 20)
+        water = measure(saturate, args, 20)
+        deviation = max(abs(a - b) for a, b in zip(saturate_iterative(*args), saturate(*args)))
+        print(f'{n:>4} views: iterative {iterative * 1e3:8.3f}ms, water-filling {water * 1e3:8.3f}ms, '
+              f'max deviation {deviation:.2e}')
+
+
+if __name__ == '__main__':
+    main()
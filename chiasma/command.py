@@ -1,7 +1,7 @@
 from typing import TypeVar, Callable, Generic
 import inspect
 
-from amino import List, Either, Map, Lists, do, Do, _, L, Try, Dat, Maybe
+from amino import List, Either, Map, Lists, do, Do, _, L, Try, Dat, Maybe, Right, Left
 
 from chiasma.io.compute import TmuxIO
 
@@ -52,10 +52,30 @@ def cons_tmux_data(data: List[Map[str, str]], cons: Callable[..., Either[str, A]
     return data.traverse(lambda kw: Try(cons, **kw).join, Either)
 
 
+@do(Either[str, A])
+def cons_target_data(output: List[str], cmd_data: TmuxCmdData[A]) -> Do:
+    line = yield output.head.to_either('no output')
+    yield Try(cmd_data.cons, **tmux_attr_map(cmd_data.attrs, line)).join
+
+
+@do(TmuxIO[Either[str, A]])
+def tmux_target_data(target: str, cmd_data: TmuxCmdData[A]) -> Do:
+    '''query the attributes of a single pane, window or session with `display-message`, which only formats the
+    target instead of listing all entities of the server.
+    If the target doesn't exist, tmux reports an error, which is returned as `Left`.
+    '''
+    output = yield (
+        TmuxIO.read('display-message', '-p', '-t', target, tmux_fmt_attrs(cmd_data.attrs))
+        .map(Right)
+        .recover_error(lambda err: Left(Lists.wrap(err).join_tokens))
+    )
+    return output.flat_map(lambda a: cons_target_data(a, cmd_data))
+
+
 @do(TmuxIO[A])
 def tmux_data_cmd(cmd: str, args: List[str], cmd_data: TmuxCmdData[A]) -> Do:
     data = yield simple_tmux_cmd_attrs(cmd, args, cmd_data.attrs)
     yield TmuxIO.from_either(cons_tmux_data(data, cmd_data.cons))
 
 
-__all__ = ('tmux_data_cmd', 'TmuxCmdData')
+__all__ = ('tmux_data_cmd', 'TmuxCmdData', 'tmux_target_data')
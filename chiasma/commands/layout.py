@@ -0,0 +1,129 @@
+import re
+from typing import Tuple
+
+from amino import Dat, Either, List, Lists, Nil, Left, Right, do, Do, Regex
+from amino.case import Case
+
+from chiasma.io.compute import TmuxIO
+from chiasma.command import TmuxCmdData, tmux_target_data
+from chiasma.commands.window import window_id
+from chiasma.data.view_tree import ViewTree, LayoutNode, PaneNode, SubUiNode
+
+cell_re = re.compile(r'(\d+)x(\d+),(\d+),(\d+)')
+pane_id_re = re.compile(r',(\d+)')
+window_layout_re = Regex('^(?P<checksum>[0-9a-f]{4}),(?P<description>.*)$')
+
+
+def layout_checksum(description: str) -> str:
+    csum = 0
+    for c in description:
+        csum = (csum >> 1) + ((csum & 1) << 15)
+        csum = (csum + ord(c)) & 0xffff
+    return f'{csum:04x}'
+
+
+class CellGeometry(Dat['CellGeometry']):
+
+    def __init__(self, width: int, height: int, x: int, y: int) -> None:
+        self.width = width
+        self.height = height
+        self.x = x
+        self.y = y
+
+
+class LayoutCell(Dat['LayoutCell']):
+
+    def __init__(self, geometry: CellGeometry, vertical: bool) -> None:
+        self.geometry = geometry
+        self.vertical = vertical
+
+
+class PaneCell(Dat['PaneCell']):
+
+    def __init__(self, geometry: CellGeometry, id: int) -> None:
+        self.geometry = geometry
+        self.id = id
+
+
+LayoutTree = ViewTree[LayoutCell, PaneCell]
+ParsedCell = Tuple[LayoutTree, int]
+ParsedCells = Tuple[List[LayoutTree], int]
+
+
+def parse_cell(text: str, pos: int) -> Either[str, ParsedCell]:
+    cell = cell_re.match(text, pos)
+    if cell is None:
+        return Left(f'invalid layout cell at {pos} in `{text}`')
+    geometry = CellGeometry(*map(int, cell.groups()))
+    end = cell.end()
+    bracket = text[end:end + 1]
+    if bracket in ('{', '['):
+        vertical = bracket == '['
+        sub = parse_cells(text, end + 1, ']' if vertical else '}')
+        return sub.map(lambda a: (ViewTree.layout(LayoutCell(geometry, vertical), a[0]), a[1]))
+    pane_id = pane_id_re.match(text, end)
+    return (
+        Left(f'no pane id in layout cell at {pos} in `{text}`')
+        if pane_id is None else
+        Right((ViewTree.pane(PaneCell(geometry, int(pane_id.group(1)))), pane_id.end()))
+    )
+
+
+def parse_cells(text: str, pos: int, close: str) -> Either[str, ParsedCells]:
+    '''siblings are parsed in a loop, so that only nested layouts add to the recursion depth.
+    '''
+    cells = []
+    while True:
+        parsed = parse_cell(text, pos)
+        if parsed.is_left:
+            return parsed
+        cell, end = parsed.value
+        cells.append(cell)
+        separator = text[end:end + 1]
+        if separator == close:
+            return Right((Lists.wrap(cells), end + 1))
+        if separator != ',':
+            return Left(f'expected `,` or `{close}` at {end} in `{text}`')
+        pos = end + 1
+
+
+@do(Either[str, LayoutTree])
+def parse_window_layout(window_layout: str) -> Do:
+    '''parse tmux's `#{window_layout}` into a tree of cells with their geometry.
+    A window with a single pane has no layout cell, so the result is a `PaneNode` in that case.
+    '''
+    match = yield window_layout_re.match(window_layout)
+    checksum = yield match.group('checksum')
+    description = yield match.group('description')
+    yield (
+        Right(None)
+        if layout_checksum(description) == checksum else
+        Left(f'invalid checksum in window layout `{window_layout}`')
+    )
+    tree, end = yield parse_cell(description, 0)
+    yield Right(tree) if end == len(description) else Left(f'trailing data in window layout `{window_layout}`')
+
+
+cmd_data_layout = TmuxCmdData.from_cons(parse_window_layout)
+
+
+def window_layout(wid: int) -> TmuxIO[Either[str, LayoutTree]]:
+    '''the split structure and pane geometry of a window, from a single query.
+    '''
+    return tmux_target_data(window_id(wid), cmd_data_layout)
+
+
+class layout_pane_cells(Case[LayoutTree, List[PaneCell]], alg=ViewTree):
+
+    def layout_node(self, node: LayoutNode[LayoutCell, PaneCell]) -> List[PaneCell]:
+        return node.sub.flat_map(self)
+
+    def pane_node(self, node: PaneNode[LayoutCell, PaneCell]) -> List[PaneCell]:
+        return List(node.data)
+
+    def sub_ui_node(self, node: SubUiNode[LayoutCell, PaneCell]) -> List[PaneCell]:
+        return Nil
+
+
+__all__ = ('layout_checksum', 'CellGeometry', 'LayoutCell', 'PaneCell', 'LayoutTree', 'parse_window_layout',
+           'window_layout', 'layout_pane_cells')
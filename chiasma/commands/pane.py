@@ -3,7 +3,7 @@ from amino.util.numeric import parse_int
 from amino.logging import module_log
 
 from chiasma.io.compute import TmuxIO
-from chiasma.command import tmux_data_cmd, TmuxCmdData, simple_tmux_cmd_attr
+from chiasma.command import tmux_data_cmd, TmuxCmdData, simple_tmux_cmd_attr, tmux_target_data
 from chiasma.data.window import Window
 from chiasma.data.pane import Pane
 from chiasma.commands.window import window_id, parse_window_id
@@ -102,16 +102,24 @@ def window_panes(wid: int) -> TmuxIO[List[PaneData]]:
     return tmux_data_cmd('list-panes', List('-t', window_id(wid)), cmd_data_pane)
 
 
+def find_pane(id: int) -> TmuxIO[Either[str, PaneData]]:
+    return tmux_target_data(pane_id(id), cmd_data_pane).map(lambda a: a.lmap(lambda err: f'no pane with id `{id}`'))
+
+
+def pane_in_window(wid: int, pane: Either[str, PaneData]) -> Either[str, PaneData]:
+    return pane.filter_with(_.window_id == wid, lambda a: f'pane {a.id} is not in window {wid}')
+
+
 @do(TmuxIO[PaneData])
 def window_pane(wid: int, pane_id: int) -> Do:
-    panes = yield window_panes(wid)
-    yield TmuxIO.from_maybe(panes.find(_.id == pane_id), f'no pane with id `{pane_id}`')
+    pane = yield find_pane(pane_id)
+    yield TmuxIO.from_either(pane_in_window(wid, pane))
 
 
 @do(TmuxIO[PaneData])
 def pane(pane_id: int) -> Do:
-    panes = yield all_panes()
-    yield TmuxIO.from_maybe(panes.find(_.id == pane_id), f'no pane with id `{pane_id}`')
+    pane = yield find_pane(pane_id)
+    yield TmuxIO.from_either(pane)
 
 
 @do(TmuxIO[int])
@@ -133,10 +141,8 @@ def pane_loc(window: Window, pane: Pane) -> Do:
     return PaneLoc(window_id, pane_id)
 
 
-@do(TmuxIO[Either[str, PaneData]])
-def pane_from_loc(loc: PaneLoc) -> Do:
-    panes = yield window_panes(loc.window_id)
-    return panes.find(_.id == loc.pane_id).to_either(lambda: f'no pane with id {loc.pane_id} in window {loc.window_id}')
+def pane_from_loc(loc: PaneLoc) -> TmuxIO[Either[str, PaneData]]:
+    return find_pane(loc.pane_id).map(L(pane_in_window)(loc.window_id, _))
 
 
 @do(TmuxIO[Either[str, PaneData]])
@@ -152,16 +158,12 @@ def create_pane_from_data(window: Window, pane: Pane, dir: Path) -> Do:
     yield TmuxIO.from_maybe(panes.head, lambda: f'no output when creating pane in {window}')
 
 
-@do(TmuxIO[Boolean])
-def pane_open(id: int) -> Do:
-    ps = yield all_panes()
-    return ps.exists(_.id == id)
+def pane_open(id: int) -> TmuxIO[Boolean]:
+    return find_pane(id).map(lambda a: Boolean(a.is_right))
 
 
-@do(TmuxIO[Boolean])
-def window_pane_open(wid: int, id: int) -> Do:
-    ps = yield window_panes(wid)
-    return ps.exists(_.id == id)
+def window_pane_open(wid: int, id: int) -> TmuxIO[Boolean]:
+    return find_pane(id).map(lambda a: Boolean(pane_in_window(wid, a).is_right))
 
 
 def resize_pane(id: int, vertical: Boolean, size: int) -> TmuxIO[None]:
@@ -174,6 +176,10 @@ def move_pane(id: int, ref_id: int, vertical: Boolean) -> TmuxIO[None]:
     return TmuxIO.write('move-pane', '-d', '-s', pane_id(id), '-t', pane_id(ref_id), direction)
 
 
+def swap_pane(id: int, target_id: int) -> TmuxIO[None]:
+    return TmuxIO.write('swap-pane', '-d', '-s', pane_id(id), '-t', pane_id(target_id))
+
+
 def close_pane_id(pane_id: int) -> TmuxIO[None]:
     return TmuxIO.write(*pane_cmd(pane_id, 'kill-pane'))
 
@@ -218,4 +224,4 @@ def select_pane(id: int) -> TmuxIO[int]:
 
 __all__ = ('all_panes', 'window_panes', 'pane', 'resize_pane', 'pane_open', 'create_pane_from_data', 'move_pane',
            'close_pane', 'send_keys', 'capture_pane', 'window_pane', 'close_pane_id', 'pane_width', 'pane_height',
-           'pane_pid', 'window_pane_open', 'select_pane',)
+           'pane_pid', 'window_pane_open', 'select_pane', 'swap_pane',)
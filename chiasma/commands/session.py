@@ -1,8 +1,8 @@
-from amino import Dat, do, Either, Do, Right, List, Nil, Regex, _, Boolean
+from amino import Dat, do, Either, Do, Right, List, Nil, Regex, Boolean
 from amino.util.numeric import parse_int
 
 from chiasma.io.compute import TmuxIO
-from chiasma.command import tmux_data_cmd, TmuxCmdData
+from chiasma.command import tmux_data_cmd, TmuxCmdData, tmux_target_data
 
 
 session_id_re = Regex('^\$(?P<id>\d+)$')
@@ -38,10 +38,8 @@ def sessions() -> TmuxIO[List[SessionData]]:
     return tmux_data_cmd('list-sessions', Nil, cmd_data_session)
 
 
-@do(TmuxIO[Boolean])
-def session_exists(id: str) -> Do:
-    ss = yield sessions()
-    yield Right(ss.exists(_.id == id))
+def session_exists(id: int) -> TmuxIO[Boolean]:
+    return tmux_target_data(session_id(id), cmd_data_session).map(lambda a: Boolean(a.is_right))
 
 
 @do(TmuxIO[SessionData])
@@ -1,8 +1,8 @@
-from amino import Dat, do, Either, Do, Right, List, Nil, Regex, _, Boolean
+from amino import Dat, do, Either, Do, Right, List, Nil, Regex, Boolean
 from amino.util.numeric import parse_int
 
 from chiasma.io.compute import TmuxIO
-from chiasma.command import tmux_data_cmd, TmuxCmdData
+from chiasma.command import tmux_data_cmd, TmuxCmdData, tmux_target_data
 from chiasma.commands.session import session_id
 
 
@@ -43,16 +43,16 @@ def windows() -> TmuxIO[List[WindowData]]:
     return tmux_data_cmd('list-windows', List('-a'), cmd_data_window)
 
 
-@do(TmuxIO[Either[str, WindowData]])
-def window(window_id: int) -> Do:
-    ws = yield windows()
-    return ws.find(_.id == window_id).to_either(lambda: f'no window with id {window_id}')
+def find_window(target: str, error: str) -> TmuxIO[Either[str, WindowData]]:
+    return tmux_target_data(target, cmd_data_window).map(lambda a: a.lmap(lambda err: error))
 
 
-@do(TmuxIO[Boolean])
-def window_exists(id: str) -> Do:
-    ss = yield windows()
-    yield Right(ss.exists(_.id == id))
+def window(wid: int) -> TmuxIO[Either[str, WindowData]]:
+    return find_window(window_id(wid), f'no window with id {wid}')
+
+
+def window_exists(id: int) -> TmuxIO[Boolean]:
+    return window(id).map(lambda a: Boolean(a.is_right))
 
 
 @do(TmuxIO[None])
@@ -67,10 +67,15 @@ def session_windows(sid: str) -> Do:
     yield tmux_data_cmd('list-windows', List('-t', session_id(sid)), cmd_data_window)
 
 
-@do(TmuxIO[Either[str, WindowData]])
-def session_window(session_id: str, window_id: str) -> Do:
-    windows = yield session_windows(session_id)
-    return windows.find(_.id == window_id).to_either(lambda: f'no window with id {window_id} in session {session_id}')
+def session_window(sid: int, wid: int) -> TmuxIO[Either[str, WindowData]]:
+    '''the target `$session:@window` only resolves if the window is linked into the session.
+    '''
+    return find_window(f'{session_id(sid)}:{window_id(wid)}', f'no window with id {wid} in session {sid}')
+
+
+def select_layout(wid: int, layout: str) -> TmuxIO[None]:
+    return TmuxIO.write('select-layout', '-t', window_id(wid), f'"{layout}"')
 
 
-__all__ = ('windows', 'window_exists', 'create_window', 'session_window', 'window', 'session_windows', 'window_id')
+__all__ = ('windows', 'window_exists', 'create_window', 'session_window', 'window', 'session_windows', 'window_id',
+           'select_layout')
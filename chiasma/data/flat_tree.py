@@ -0,0 +1,126 @@
+from array import array
+from typing import TypeVar, Generic, Any, Callable, Iterator
+
+from amino import Dat, List, Maybe, Lists
+
+from chiasma.data.view_tree import ViewTree, LayoutNode, PaneNode, SubUiNode
+from chiasma.util.id import Ident
+
+L = TypeVar('L')
+P = TypeVar('P')
+layout_kind = 0
+pane_kind = 1
+sub_ui_kind = 2
+no_node = -1
+
+
+class FlatViewTree(Generic[L, P], Dat['FlatViewTree[L, P]']):
+    '''a view tree encoded as index arrays, with the nodes numbered in depth-first order, so that the root is at 0 and
+    each node precedes its descendants.
+    For each node, `kinds` stores whether it is a layout, pane or sub ui, `parent`, `first_child` and `next_sibling`
+    store the indexes of its neighbours or -1, and `data` stores its view.
+    '''
+
+    def __init__(self, kinds: array, parent: array, first_child: array, next_sibling: array, data: List[Any]
+                 ) -> None:
+        self.kinds = kinds
+        self.parent = parent
+        self.first_child = first_child
+        self.next_sibling = next_sibling
+        self.data = data
+
+    @property
+    def size(self) -> int:
+        return len(self.kinds)
+
+    def children(self, index: int) -> Iterator[int]:
+        child = self.first_child[index]
+        while child != no_node:
+            yield child
+            child = self.next_sibling[child]
+
+
+def node_kind(node: ViewTree[L, P]) -> int:
+    return (
+        layout_kind
+        if isinstance(node, LayoutNode) else
+        pane_kind
+        if isinstance(node, PaneNode) else
+        sub_ui_kind
+    )
+
+
+def flatten_view_tree(tree: ViewTree[L, P]) -> FlatViewTree[L, P]:
+    kinds, parent, first_child, next_sibling = array('b'), array('i'), array('i'), array('i')
+    data = []
+    last_child = []
+    stack = [(tree, no_node)]
+    while stack:
+        node, node_parent = stack.pop()
+        index = len(kinds)
+        kinds.append(node_kind(node))
+        parent.append(node_parent)
+        first_child.append(no_node)
+        next_sibling.append(no_node)
+        last_child.append(no_node)
+        data.append(node.data)
+        if node_parent != no_node:
+            previous = last_child[node_parent]
+            if previous == no_node:
+                first_child[node_parent] = index
+            else:
+                next_sibling[previous] = index
+            last_child[node_parent] = index
+        if isinstance(node, LayoutNode):
+            stack.extend((sub, index) for sub in reversed(node.sub))
+    return FlatViewTree(kinds, parent, first_child, next_sibling, Lists.wrap(data))
+
+
+def unflatten_view_tree(flat: FlatViewTree[L, P]) -> ViewTree[L, P]:
+    '''since children have larger indexes than their parents, the nodes are built from the last to the first.
+    '''
+    nodes = [None] * flat.size
+    for index in range(flat.size - 1, -1, -1):
+        kind = flat.kinds[index]
+        data = flat.data[index]
+        nodes[index] = (
+            LayoutNode(data, Lists.wrap([nodes[a] for a in flat.children(index)]))
+            if kind == layout_kind else
+            PaneNode(data)
+            if kind == pane_kind else
+            SubUiNode(data)
+        )
+    return nodes[0]
+
+
+def flat_find(flat: FlatViewTree[L, P], pred: Callable[[int], bool]) -> Maybe[int]:
+    '''the first node in depth-first order that satisfies `pred`.
+    '''
+    return Maybe.optional(next((a for a in range(flat.size) if pred(a)), None))
+
+
+def flat_view_index(flat: FlatViewTree[L, P], ident: Ident) -> Maybe[int]:
+    return flat_find(flat, lambda a: flat.kinds[a] != sub_ui_kind and flat.data[a].ident == ident)
+
+
+def flat_pane_index(flat: FlatViewTree[L, P], ident: Ident) -> Maybe[int]:
+    return flat_find(flat, lambda a: flat.kinds[a] == pane_kind and flat.data[a].ident == ident)
+
+
+def flat_path(flat: FlatViewTree[L, P], index: int) -> List[int]:
+    '''the indexes of the ancestors of a node, starting at the root.
+    '''
+    path = []
+    current = flat.parent[index]
+    while current != no_node:
+        path.append(current)
+        current = flat.parent[current]
+    return Lists.wrap(reversed(path))
+
+
+def flat_panes(flat: FlatViewTree[L, P]) -> List[P]:
+    return Lists.wrap(flat.data[a] for a in range(flat.size) if flat.kinds[a] == pane_kind)
+
+
+__all__ = ('FlatViewTree', 'flatten_view_tree', 'unflatten_view_tree', 'flat_find', 'flat_view_index',
+           'flat_pane_index', 'flat_path', 'flat_panes')
@@ -1,24 +1,53 @@
-from amino import Dat, List, Nil, Either, _, Just
-from amino.lenses.lens import lens
+from typing import TypeVar
+
+from amino import Dat, List, Nil, Either, Just, Map, Lists
 
 from chiasma.data.session import Session
-from chiasma.data.window import Window
+from chiasma.data.window import Window, RenderedWindow
 from chiasma.data.pane import Pane
 from chiasma.util.id import Ident
 
+A = TypeVar('A')
+
+
+def ident_index(items: List[A]) -> Map[Ident, int]:
+    return Map((a.ident, i) for i, a in reversed(list(enumerate(items))))
+
+
+def id_index(panes: List[Pane]) -> Map[int, int]:
+    return Map((a.id | None, i) for i, a in reversed(list(enumerate(panes))) if a.id.present)
+
+
+def replace_at(items: List[A], index: int, a: A) -> List[A]:
+    updated = list(items)
+    updated[index] = a
+    return Lists.wrap(updated)
+
 
 class Views(Dat['Views']):
+    '''the sessions, windows and panes that are managed by chiasma.
+    The position of each entity in its list is indexed by its ident, and that of each pane by its tmux id, so that
+    lookups don't have to scan the lists.
+    The indexes are maintained by the update methods; `cons` has to be used to create an instance from lists.
+    `rendered` stores the layout that was last packed into each window, by the window's ident.
+    '''
 
     @staticmethod
     def cons(
             sessions: List[Session]=Nil,
             windows: List[Window]=Nil,
             panes: List[Pane]=Nil,
+            rendered: Map[Ident, RenderedWindow]=None,
     ) -> 'Views':
         return Views(
             sessions,
             windows,
             panes,
+            ident_index(sessions),
+            ident_index(windows),
+            ident_index(panes),
+            id_index(panes),
+            Map() if rendered is None else rendered,
         )
 
     def __init__(
@@ -26,31 +55,77 @@ class Views(Dat['Views']):
             sessions: List[Session],
             windows: List[Window],
             panes: List[Pane],
+            session_index: Map[Ident, int],
+            window_index: Map[Ident, int],
+            pane_index: Map[Ident, int],
+            pane_id_index: Map[int, int],
+            rendered: Map[Ident, RenderedWindow],
     ) -> None:
         self.sessions = sessions
         self.windows = windows
         self.panes = panes
+        self.session_index = session_index
+        self.window_index = window_index
+        self.pane_index = pane_index
+        self.pane_id_index = pane_id_index
+        self.rendered = rendered
 
     def update_session(self, session: Session) -> 'Views':
-        return lens.sessions.Each().Filter(_.ident == session.ident).set(session)(self)
+        return (
+            self.session_index.lift(session.ident)
+            .map(lambda i: self.copy(sessions=replace_at(self.sessions, i, session))) |
+            self
+        )
 
     def add_pane(self, pane: Pane) -> 'Views':
-        return self.append1.panes(pane)
+        index = self.panes.length
+        return self.copy(
+            panes=self.panes.cat(pane),
+            pane_index=self.pane_index.insert_if_absent(pane.ident, lambda: index),
+            pane_id_index=pane.id.map(lambda a: self.pane_id_index.insert_if_absent(a, lambda: index)) |
+            self.pane_id_index,
+        )
 
     def update_pane(self, pane: Pane) -> 'Views':
-        return lens.panes.Each().Filter(_.ident == pane.ident).set(pane)(self)
+        '''if the tmux id changes, the old id is dropped from the index unless it refers to another pane, and like in
+        `add_pane`, the new id is only indexed if it doesn't already refer to another pane.
+        '''
+        def update_ids(index: int, old: Pane) -> Map[int, int]:
+            without = (
+                old.id
+                .filter(lambda a: self.pane_id_index.lift(a).contains(index))
+                .map(lambda a: self.pane_id_index - a) |
+                self.pane_id_index
+            )
+            return pane.id.map(lambda a: without.insert_if_absent(a, lambda: index)) | without
+        def update(index: int) -> 'Views':
+            old = self.panes[index]
+            return self.copy(
+                panes=replace_at(self.panes, index, pane),
+                pane_id_index=self.pane_id_index if old.id == pane.id else update_ids(index, old),
+            )
+        return self.pane_index.lift(pane.ident).map(update) | self
 
     def set_pane_id(self, pane: Pane, id: str) -> 'Views':
         return self.update_pane(pane.copy(id=Just(id)))
 
+    def set_rendered(self, ident: Ident, rendered: RenderedWindow) -> 'Views':
+        return self.copy(rendered=self.rendered + (ident, rendered))
+
+    def pane_ids(self) -> Map[Ident, int]:
+        return Map((a.ident, a.id | None) for a in self.panes if a.id.present)
+
     def session_by_ident(self, ident: Ident) -> Either[str, Session]:
-        return self.sessions.find(_.ident == ident).to_either(f'no session for `{ident}`')
+        return self.session_index.lift(ident).map(lambda i: self.sessions[i]).to_either(f'no session for `{ident}`')
 
     def window_by_ident(self, ident: Ident) -> Either[str, Window]:
-        return self.windows.find(_.ident == ident).to_either(f'no window for `{ident}`')
+        return self.window_index.lift(ident).map(lambda i: self.windows[i]).to_either(f'no window for `{ident}`')
 
     def pane_by_ident(self, ident: Ident) -> Either[str, Pane]:
-        return self.panes.find(_.ident == ident).to_either(lambda: f'no pane for `{ident}`')
+        return self.pane_index.lift(ident).map(lambda i: self.panes[i]).to_either(lambda: f'no pane for `{ident}`')
+
+    def pane_by_id(self, id: int) -> Either[str, Pane]:
+        return self.pane_id_index.lift(id).map(lambda i: self.panes[i]).to_either(lambda: f'no tmux pane for `{id}`')
 
 
 __all__ = ('Views',)
@@ -2,7 +2,11 @@ from typing import Generic, TypeVar, Callable, Any
 
 from amino import ADT, List, Nil, Either, Right, Left, Boolean, Maybe, Nothing, __, _, do, Do, Dat
 
+from amino.tc.context import context, Bindings
+
 from chiasma.util.id import Ident
+from chiasma.ui.view import UiPane, UiLayout, UiView
+from chiasma.util.weak import WeakIdentityMap
 from amino.case import Case
 
 
@@ -100,6 +104,66 @@ def layout_panes(node: LayoutNode) -> List[PaneNode]:
     return node.sub.filter(Boolean.is_a(PaneNode))
 
 
+class tree_panes(Case[ViewTree[L, P], List[P]], alg=ViewTree):
+    '''the data of all pane nodes in a tree, depth first.
+    '''
+
+    def layout_node(self, node: LayoutNode[L, P]) -> List[P]:
+        return node.sub.flat_map(self)
+
+    def pane_node(self, node: PaneNode[L, P]) -> List[P]:
+        return List(node.data)
+
+    def sub_ui_node(self, node: SubUiNode[L, P]) -> List[P]:
+        return Nil
+
+
+@context(P=UiPane, L=UiLayout)
+class content_hash(Case[ViewTree[L, P], int], alg=ViewTree):
+    '''only the fields provided by the view typeclasses are hashed, so that views may contain unhashable data.
+    '''
+
+    def __init__(self, bindings: Bindings) -> None:
+        self.bindings = bindings
+        self.sub_hash = tree_hash(bindings)
+        self.pane = UiPane.fatal(bindings.bindings['P'])
+        self.pane_view = UiView.fatal(bindings.bindings['P'])
+        self.layout_view = UiView.fatal(bindings.bindings['L'])
+
+    def layout_node(self, node: LayoutNode[L, P]) -> int:
+        view = node.data
+        tc = self.layout_view
+        sub = tuple(node.sub.map(self.sub_hash))
+        return hash(('layout', tc.ident(view), tc.state(view), tc.geometry(view), bool(view.vertical), sub))
+
+    def pane_node(self, node: PaneNode[L, P]) -> int:
+        view = node.data
+        tc = self.pane_view
+        return hash((
+            'pane',
+            self.pane.ident(view),
+            tc.state(view),
+            tc.geometry(view),
+            bool(self.pane.open(view)),
+            bool(self.pane.pin(view)),
+        ))
+
+    def sub_ui_node(self, node: SubUiNode[L, P]) -> int:
+        return hash(('sub_ui', id(node.data)))
+
+
+tree_hashes = WeakIdentityMap()
+
+
+@context(P=UiPane, L=UiLayout)
+def tree_hash(bindings: Bindings, node: ViewTree[L, P]) -> int:
+    '''hash of a subtree that covers the ident, state, geometry and flags of all of its views.
+    The hash is cached for the node and combines the cached hashes of the subtrees. Since the modifying functions
+    share unchanged subtrees, only the nodes on the paths to changed views are hashed again.
+    '''
+    return tree_hashes.lookup(node).get_or(lambda: tree_hashes.store(node, content_hash(bindings)()(node)))
+
+
 class ViewTreeCallbacks(Generic[L, P], Dat['ViewTreeCallbacks[L, P]']):
 
     @staticmethod
@@ -130,16 +194,20 @@ class ViewTreeCallbacks(Generic[L, P], Dat['ViewTreeCallbacks[L, P]']):
 
 
 class map_view_tree(Case[ViewTree[L, P], ViewTree[L, P]], alg=ViewTree):
+    '''nodes are only copied if they or one of their descendants were updated, so that unchanged subtrees are
+    shared with the original tree and the identity of a node indicates whether it changed.
+    '''
 
     def __init__(self, f: ViewTreeCallbacks[LayoutNode[L, P], PaneNode[L, P]]) -> None:
         self.f = f
 
     def layout_node(self, node: LayoutNode[L, P]) -> ViewTree:
-        sub = node.mod.sub(__.map(self))
+        sub = node.sub.map(self)
+        mapped = node if all(a is b for a, b in zip(sub, node.sub)) else node.set.sub(sub)
         return (
-            self.f.update_layout(sub)
-            if self.f.pred_layout(sub) else
-            sub
+            self.f.update_layout(mapped)
+            if self.f.pred_layout(mapped) else
+            mapped
         )
 
     def pane_node(self, node: PaneNode[L, P]) -> ViewTree:
@@ -191,4 +259,5 @@ def map_panes(
 
 
 __all__ = ('ViewTree', 'PaneNode', 'LayoutNode', 'reference_node', 'find_pane', 'layout_panes', 'map_views',
-           'find_in_view_tree', 'map_panes', 'map_layouts', 'map_view_tree', 'map_layout_nodes', 'map_pane_nodes',)
+           'find_in_view_tree', 'map_panes', 'map_layouts', 'map_view_tree', 'map_layout_nodes', 'map_pane_nodes',
+           'tree_panes', 'content_hash', 'tree_hashes', 'tree_hash',)
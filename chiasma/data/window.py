@@ -1,6 +1,7 @@
-from amino import Dat, Maybe
+from amino import Dat, Maybe, Map
 
 from chiasma.util.id import Ident, IdentSpec, ensure_ident_or_generate
+from chiasma.data.view_tree import ViewTree
 
 
 class Window(Dat['Window']):
@@ -20,4 +21,19 @@ class Window(Dat['Window']):
         self.id = id
 
 
-__all__ = ('Window',)
+class RenderedWindow(Dat['RenderedWindow']):
+    '''the measured layout that was last packed into a window, with the window's dimensions and the tmux ids of the
+    panes at that time, used to determine which parts of the layout have to be packed again.
+    `layout_hash` is the `tree_hash` of the rendered layout.
+    '''
+
+    def __init__(self, tree: ViewTree, pane_ids: Map[Ident, int], width: int, height: int, layout_hash: int
+                 ) -> None:
+        self.tree = tree
+        self.pane_ids = pane_ids
+        self.width = width
+        self.height = height
+        self.layout_hash = layout_hash
+
+
+__all__ = ('Window', 'RenderedWindow')
@@ -0,0 +1,147 @@
+from typing import TypeVar, Generic, Callable, Tuple
+
+from amino import Dat, List, Nil, Either, Right, Left, Maybe, Map, Lists, Nothing
+from amino.case import Case
+
+from chiasma.data.view_tree import ViewTree, LayoutNode, PaneNode, SubUiNode
+from chiasma.util.id import Ident
+from chiasma.util.weak import WeakIdentityMap
+
+L = TypeVar('L')
+P = TypeVar('P')
+TreePath = List[int]
+
+
+def replace_at(items: List[ViewTree[L, P]], index: int, node: ViewTree[L, P]) -> List[ViewTree[L, P]]:
+    updated = list(items)
+    updated[index] = node
+    return Lists.wrap(updated)
+
+
+class Crumb(Generic[L, P], Dat['Crumb[L, P]']):
+    '''a layout on the way from the root to the focus of a zipper, together with the position of the subtree that was
+    descended into.
+    '''
+
+    def __init__(self, parent: LayoutNode[L, P], index: int) -> None:
+        self.parent = parent
+        self.index = index
+
+
+class ViewTreeZipper(Generic[L, P], Dat['ViewTreeZipper[L, P]']):
+    '''a subtree in focus and the layouts leading to it, innermost last.
+    Moving up replaces the focused subtree in its parent, so that only the layouts on the path are rebuilt and their
+    other subtrees are shared with the original tree.
+    '''
+
+    @staticmethod
+    def cons(tree: ViewTree[L, P]) -> 'ViewTreeZipper[L, P]':
+        return ViewTreeZipper(tree, Nil)
+
+    def __init__(self, focus: ViewTree[L, P], crumbs: List[Crumb[L, P]]) -> None:
+        self.focus = focus
+        self.crumbs = crumbs
+
+    @property
+    def crumb(self) -> Maybe[Crumb[L, P]]:
+        return self.crumbs.last
+
+    @property
+    def pane(self) -> Either[str, PaneNode[L, P]]:
+        return Right(self.focus) if isinstance(self.focus, PaneNode) else Left('zipper focus is not a pane')
+
+    def down(self, index: int) -> Either[str, 'ViewTreeZipper[L, P]']:
+        focus = self.focus
+        return (
+            focus.sub.lift(index).map(lambda a: ViewTreeZipper(a, self.crumbs.cat(Crumb(focus, index))))
+            if isinstance(focus, LayoutNode) else
+            Nothing
+        ).to_either(f'no subtree at {index} in zipper focus')
+
+    def follow(self, path: TreePath) -> Either[str, 'ViewTreeZipper[L, P]']:
+        return path.fold_m(Right(self))(lambda z, i: z.down(i))
+
+    def up_with(self, crumb: Crumb[L, P]) -> 'ViewTreeZipper[L, P]':
+        return ViewTreeZipper(crumb.parent.set.sub(replace_at(crumb.parent.sub, crumb.index, self.focus)),
+                              self.crumbs[:-1])
+
+    @property
+    def up(self) -> Either[str, 'ViewTreeZipper[L, P]']:
+        return self.crumb.map(self.up_with).to_either('zipper is at the root')
+
+    def replace(self, focus: ViewTree[L, P]) -> 'ViewTreeZipper[L, P]':
+        return self.copy(focus=focus)
+
+    def modify(self, f: Callable[[ViewTree[L, P]], ViewTree[L, P]]) -> 'ViewTreeZipper[L, P]':
+        return self.replace(f(self.focus))
+
+    @property
+    def root(self) -> ViewTree[L, P]:
+        zipper = self
+        for crumb in reversed(self.crumbs):
+            zipper = zipper.up_with(crumb)
+        return zipper.focus
+
+
+class view_paths(Case[ViewTree[L, P], List[Tuple[Ident, TreePath]]], alg=ViewTree):
+    '''the paths of all panes and layouts in a tree, depth first.
+    '''
+
+    def layout_node(self, node: LayoutNode[L, P], path: TreePath) -> List[Tuple[Ident, TreePath]]:
+        return node.sub.with_index.flat_map2(lambda i, a: self(a, path.cat(i))).cons((node.data.ident, path))
+
+    def pane_node(self, node: PaneNode[L, P], path: TreePath) -> List[Tuple[Ident, TreePath]]:
+        return List((node.data.ident, path))
+
+    def sub_ui_node(self, node: SubUiNode[L, P], path: TreePath) -> List[Tuple[Ident, TreePath]]:
+        return Nil
+
+
+def path_index(tree: ViewTree[L, P]) -> Map[Ident, TreePath]:
+    '''if an ident occurs more than once, the first occurrence is indexed.
+    '''
+    return Map(reversed(view_paths()(tree, Nil)))
+
+
+class ViewTreeIndex(WeakIdentityMap[ViewTree, Map[Ident, TreePath]]):
+    '''path indexes of trees, held for as long as the trees exist.
+    A tree that is derived from an indexed tree without changing its structure or the idents of its views can
+    `inherit` the index, so that it isn't rebuilt after each modification.
+    Paths are verified when they are followed, so a stale index is rebuilt rather than returning the wrong view.
+    '''
+
+    def paths(self, tree: ViewTree[L, P]) -> Map[Ident, TreePath]:
+        return self.lookup(tree).get_or(lambda: self.store(tree, path_index(tree)))
+
+    def inherit(self, tree: ViewTree[L, P], updated: ViewTree[L, P]) -> ViewTree[L, P]:
+        self.lookup(tree).foreach(lambda a: self.store(updated, a))
+        return updated
+
+    def zipper_at(self, tree: ViewTree[L, P], ident: Ident) -> Either[str, ViewTreeZipper[L, P]]:
+        def find(paths: Map[Ident, TreePath]) -> Maybe[ViewTreeZipper[L, P]]:
+            return (
+                paths.lift(ident)
+                .flat_map(lambda a: ViewTreeZipper.cons(tree).follow(a).to_maybe)
+                .filter(lambda a: a.focus.data.ident == ident)
+            )
+        return (
+            self.lookup(tree)
+            .flat_map(find)
+            .or_else_call(lambda: find(self.store(tree, path_index(tree))))
+            .to_either(lambda: f'no view `{ident}` in tree')
+        )
+
+
+view_tree_index = ViewTreeIndex()
+
+
+def view_zipper(tree: ViewTree[L, P], ident: Ident) -> Either[str, ViewTreeZipper[L, P]]:
+    return view_tree_index.zipper_at(tree, ident)
+
+
+def indexed_pane(tree: ViewTree[L, P], ident: Ident) -> Either[str, P]:
+    return view_zipper(tree, ident).flat_map(lambda a: a.pane).map(lambda a: a.data)
+
+
+__all__ = ('TreePath', 'Crumb', 'ViewTreeZipper', 'view_paths', 'path_index', 'ViewTreeIndex', 'view_tree_index',
+           'view_zipper', 'indexed_pane')
@@ -1,18 +1,22 @@
 import abc
 import time
+import asyncio
 import inspect
+import traceback
+from types import FrameType
 from traceback import FrameSummary
-from typing import TypeVar, Callable, Any, Generic, Union, Tuple
+from typing import TypeVar, Callable, Any, Generic, Tuple, Generator, Union
 
 from amino.tc.base import F, ImplicitsMeta
-from amino import Either, __, IO, Maybe, Left, Eval, List, Right, Lists, options, Nil, Just, Do, L, Nothing
-from amino.func import CallByName, tailrec
+from amino import Either, IO, Maybe, Left, List, Right, Lists, options, Nil, Just, Do, L, Nothing
+from amino.func import CallByName
 from amino.do import do
 from amino.dat import ADT, ADTMeta
+from amino.util.trace import non_internal_frame
 
 from chiasma.tmux import Tmux, TmuxCmd, TmuxCmdResult, TmuxCmdSuccess, TmuxCmdError
 from chiasma.io.data import TSuccess, TError, TFatal, TResult
-from chiasma.io.trace import TmuxIOException
+from chiasma.io.trace import TmuxIOException, internal_packages
 
 A = TypeVar('A')
 B = TypeVar('B')
@@ -28,6 +32,9 @@ class TmuxIOMeta(ADTMeta, ImplicitsMeta):
 
 
 class TmuxIO(Generic[A], F[A], ADT['TmuxIO[A]'], implicits=True, auto=True, metaclass=TmuxIOMeta):
+    '''nodes only capture the frame they are created in if `AMINO_IO_DEBUG` is set, since it is expensive and
+    happens for every single step of a computation.
+    '''
     debug = options.io_debug.exists
 
     @staticmethod
@@ -86,6 +93,17 @@ class TmuxIO(Generic[A], F[A], ADT['TmuxIO[A]'], implicits=True, auto=True, meta
     def read(cmd: str, *args: str) -> 'TmuxIO[A]':
         return TmuxRead(TmuxCmd(cmd, Lists.wrap(args)))
 
+    @staticmethod
+    def par(ios: List['TmuxIO[A]']) -> 'TmuxIO[List[A]]':
+        '''run independent computations side by side, sending the commands they issue in a single batch per round
+        trip.
+        '''
+        return TmuxPar(ios)
+
+    @staticmethod
+    def traverse_par(items: List[B], f: Callable[[B], 'TmuxIO[A]']) -> 'TmuxIO[List[A]]':
+        return TmuxPar(items.map(f))
+
     @staticmethod
     @do(IO[Tuple['TmuxIO', A]])
     def to_io(fa: 'TmuxIO[A]', tmux: Tmux) -> Do:
@@ -94,54 +112,41 @@ class TmuxIO(Generic[A], F[A], ADT['TmuxIO[A]'], implicits=True, auto=True, meta
 
     @staticmethod
     def sleep(duration: float) -> 'TmuxIO[None]':
-        return TmuxIO.delay(lambda v: time.sleep(duration))
+        '''the interpreter hands the sleep to the driver, so that running asynchronously doesn't block the loop.
+        '''
+        return TmuxSleep(duration).and_then(TmuxIO.invalidate_cache())
+
+    @staticmethod
+    def invalidate_cache() -> 'TmuxIO[None]':
+        '''discard the cached results of queries, e.g. when polling for a change that happens independently of the
+        computation.
+        '''
+        return TmuxInvalidateCache()
 
     @staticmethod
     def flush() -> 'TmuxIO[None]':
         return TmuxIO.read('list-clients').void
 
-    @abc.abstractmethod
-    def _flat_map(self, f: Callable[[A], 'TmuxIO[B]'], ts: Eval[str], fs: Eval[str]) -> 'TmuxIO[B]':
-        ...
+    def _flat_map(self, f: Callable[[A], 'TmuxIO[B]']) -> 'TmuxIO[B]':
+        return FlatMap(self, f, self.frame)
 
     @abc.abstractmethod
     def step(self, tmux: Tmux) -> 'TmuxIO[A]':
         ...
 
     def __init__(self, frame: FrameSummary=None) -> None:
-        self.frame = frame or inspect.currentframe()
+        self.frame = frame or (inspect.currentframe() if TmuxIO.debug else None)
 
     def flat_map(self, f: Callable[[A], 'TmuxIO[B]']) -> 'TmuxIO[B]':
         return self._flat_map(f)
 
-    def run(self, tmux: Tmux) -> A:
-        @tailrec
-        def run(t: 'TmuxIO[A]', writes: List[TmuxCmd]=Nil) -> Tuple[bool, Union[A, 'TmuxIO[A]']]:
-            if isinstance(t, (Suspend, BindSuspend)):
-                return True, (t.step(tmux), writes)
-            elif isinstance(t, ScheduleWrite):
-                return True, (t.next(None), writes.cat(t.cmd))
-            elif isinstance(t, ExecuteRead):
-                a = execute_read(writes, t.cmd)
-                return True, (a.flat_map(t.next), Nil)
-            elif isinstance(t, TmuxWrite):
-                a = execute_write(t.cmd)
-                return True, (a, Nil)
-            elif isinstance(t, TmuxRead):
-                a = execute_read(Nil, t.cmd)
-                return True, (a, Nil)
-            elif isinstance(t, Pure) and writes.empty:
-                return False, TSuccess(t.value)
-            elif isinstance(t, Pure):
-                a = execute_writes(writes)
-                return True, (a.and_then(t), Nil)
-            elif isinstance(t, TmuxIOError):
-                return False, TError(t.error)
-            elif isinstance(t, TmuxIOFatal):
-                return False, TFatal(t.exception)
-            else:
-                raise Exception(f'got invalid TmuxIO computation step result {t}')
-        return run(self)
+    def run(self, tmux: Tmux, cache: 'ReadCache'=None) -> TResult[A]:
+        return execute_batches(interpret(self, tmux, cache or ReadCache()), tmux)
+
+    async def run_async(self, tmux: Tmux, cache: 'ReadCache'=None) -> TResult[A]:
+        '''like `run`, but awaits the execution of each command batch, yielding to the event loop at every flush.
+        '''
+        return await execute_batches_async(interpret(self, tmux, cache or ReadCache()), tmux)
 
     def result(self, tmux: Tmux) -> TResult[A]:
         try:
@@ -161,8 +166,12 @@ class TmuxIO(Generic[A], F[A], ADT['TmuxIO[A]'], implicits=True, auto=True, meta
     def unsafe(self, tmux: Tmux) -> A:
         return self.either(tmux).get_or_raise()
 
+    @property
+    def attempt_result(self) -> 'TmuxIO[TResult[A]]':
+        return TmuxAttempt(self)
+
     def recover(self, f: Callable[[Exception], A]) -> 'TmuxIO[A]':
-        return TmuxIO.delay(self.attempt).map(__.value_or(f))
+        return self.attempt_result.map(lambda r: r.to_either.value_or(f))
 
     def recover_error(self, f: Callable[[str], A]) -> 'TmuxIO[A]':
         def recover(r: TResult[A]) -> TmuxIO[A]:
@@ -173,7 +182,7 @@ class TmuxIO(Generic[A], F[A], ADT['TmuxIO[A]'], implicits=True, auto=True, meta
                 if isinstance(r, TFatal) else
                 TmuxIO.pure(r.value)
             )
-        return TmuxIO.delay(self.result).flat_map(recover)
+        return self.attempt_result.flat_map(recover)
 
     # def recover_error_with(self, f: Callable[[str], 'TmuxIO[A]']) -> 'TmuxIO[A]':
     #     def recover(r: TResult[A]) -> TmuxIO[A]:
@@ -186,16 +195,15 @@ class TmuxIO(Generic[A], F[A], ADT['TmuxIO[A]'], implicits=True, auto=True, meta
 
     @do('TmuxIO[A]')
     def ensure(self, f: Callable[[Either[Exception, A]], 'TmuxIO[None]']) -> Do:
-        result = yield TmuxIO.delay(self.attempt)
+        result = yield self.attempt_result.map(lambda r: r.to_either)
         yield f(result)
         yield TmuxIO.from_either(result)
 
     def effect(self, f: Callable[[A], Any]) -> 'TmuxIO[A]':
-        def wrap(v: Tmux) -> A:
-            ret = self.run(v)
+        def wrap(ret: TResult[A]) -> TResult[A]:
             f(ret)
             return ret
-        return TmuxIO.delay(wrap)
+        return self.attempt_result.map(wrap)
 
     __mod__ = effect
 
@@ -206,6 +214,14 @@ class TmuxIO(Generic[A], F[A], ADT['TmuxIO[A]'], implicits=True, auto=True, meta
         return self.ensure(lambda a: TmuxIO.suspend(lambda v: a.cata(f, TmuxIO.pure)))
 
 
+def error_frame(e: Exception) -> FrameType:
+    '''if frames aren't captured when creating nodes, the callsite of a failed thunk or continuation is taken from the
+    traceback, skipping the interpreter's own frame and those of internal helpers like the thunk wrapper of `delay`.
+    '''
+    frames = Lists.wrap(traceback.walk_tb(e.__traceback__)).map(lambda a: a[0]).drop(1)
+    return frames.find(lambda a: non_internal_frame(a, internal_packages)).o(frames.head) | None
+
+
 class Suspend(Generic[A], TmuxIO[A]):
 
     def __init__(
@@ -222,47 +238,30 @@ class Suspend(Generic[A], TmuxIO[A]):
         except TmuxIOException as e:
             raise e
         except Exception as e:
-            raise TmuxIOException('', Nil, e, self.frame)
-
-    def _flat_map(self, f: Callable[[A], TmuxIO[B]]) -> TmuxIO[B]:
-        return BindSuspend(self.thunk, f, self.frame)
+            raise TmuxIOException('', Nil, e, self.frame or error_frame(e))
 
 
-class BindSuspend(Generic[A, B], TmuxIO[B]):
+class FlatMap(Generic[A, B], TmuxIO[B]):
+    '''a bind is only recorded when it is constructed; the interpreter pushes `f` on its continuation stack and
+    continues with `io`, so that chains of any length and association are evaluated in linear time and constant
+    stack depth.
+    '''
 
-    def __init__(
-            self,
-            thunk: Callable[[Tmux], TmuxIO[A]],
-            f: Callable[[A], TmuxIO[B]],
-            frame: FrameSummary=None,
-    ) -> None:
+    def __init__(self, io: TmuxIO[A], f: Callable[[A], TmuxIO[B]], frame: FrameSummary=None) -> None:
         super().__init__(frame)
-        self.thunk = thunk
+        self.io = io
         self.f = f
 
     def step(self, tmux: Tmux) -> TmuxIO[B]:
+        return self
+
+    def cont(self, a: A) -> TmuxIO[B]:
         try:
-            step = self.thunk(tmux)
+            return self.f(a)
         except TmuxIOException as e:
             raise e
         except Exception as e:
-            raise TmuxIOException('', Nil, e, self.frame)
-        if isinstance(step, TmuxWrite):
-            return ScheduleWrite(step.cmd, self.f)
-        if isinstance(step, TmuxRead):
-            return ExecuteRead(step.cmd, self.f)
-        else:
-            try:
-                return step.flat_map(self.f)
-            except TmuxIOException as e:
-                raise e
-            except Exception as e:
-                raise TmuxIOException('', Nil, e, step.frame)
-
-    def _flat_map(self, f: Callable[[B], TmuxIO[C]]) -> TmuxIO[C]:
-        def bs(tmux: Tmux) -> TmuxIO[C]:
-            return BindSuspend(self.thunk, lambda a: self.f(a).flat_map(f), self.frame)
-        return Suspend(bs)
+            raise TmuxIOException('', Nil, e, self.frame or error_frame(e))
 
 
 class Pure(Generic[A], TmuxIO[A]):
@@ -277,11 +276,6 @@ class Pure(Generic[A], TmuxIO[A]):
     def step(self, tmux: Tmux) -> TmuxIO[A]:
         return self
 
-    def _flat_map(self, f: Callable[[A], TmuxIO[B]]) -> TmuxIO[B]:
-        def g(tmux: Tmux) -> TmuxIO[B]:
-            return f(self.value)
-        return Suspend(g, Nil)
-
 
 class TmuxIOCmd(Generic[A], TmuxIO[A]):
 
@@ -292,48 +286,64 @@ class TmuxIOCmd(Generic[A], TmuxIO[A]):
     def _arg_desc(self) -> List[str]:
         return self.cmd._arg_desc()
 
-
-class TmuxWrite(Generic[A], TmuxIOCmd[A]):
-
     def step(self, tmux: Tmux) -> TmuxIO[A]:
         return self
 
-    def _flat_map(self, f: Callable[[A], TmuxIO[B]]) -> TmuxIO[B]:
-        return BindSuspend(lambda t: self, f, self.frame)
+
+class TmuxWrite(Generic[A], TmuxIOCmd[A]):
+    pass
 
 
 class TmuxRead(Generic[A], TmuxIOCmd[A]):
+    pass
+
+
+class TmuxExecute(Generic[A], TmuxIO[A]):
+
+    def __init__(self, cmds: List[TmuxCmd]) -> None:
+        super().__init__(Nil)
+        self.cmds = cmds
 
     def step(self, tmux: Tmux) -> TmuxIO[A]:
         return self
 
-    def _flat_map(self, f: Callable[[A], TmuxIO[B]]) -> TmuxIO[B]:
-        return BindSuspend(lambda t: self, f, self.frame)
-
 
-class ScheduleWrite(Generic[A], TmuxIO[A]):
+class TmuxAttempt(Generic[A], TmuxIO[TResult[A]]):
 
-    def __init__(self, cmd: TmuxCmd, next: Callable[[None], TmuxIO[A]]) -> None:
-        self.cmd = cmd
-        self.next = next
+    def __init__(self, io: TmuxIO[A]) -> None:
+        super().__init__(Nil)
+        self.io = io
 
-    def step(self, tmux: Tmux) -> TmuxIO[A]:
+    def step(self, tmux: Tmux) -> TmuxIO[TResult[A]]:
         return self
 
-    def _flat_map(self, f: Callable[[A], TmuxIO[B]]) -> TmuxIO[B]:
+
+class TmuxPar(Generic[A], TmuxIO[List[A]]):
+
+    def __init__(self, ios: List[TmuxIO[A]]) -> None:
+        super().__init__(Nil)
+        self.ios = ios
+
+    def step(self, tmux: Tmux) -> TmuxIO[List[A]]:
         return self
 
 
-class ExecuteRead(Generic[A], TmuxIO[A]):
+class TmuxSleep(TmuxIO[None]):
 
-    def __init__(self, cmd: TmuxCmd, next: Callable[[List[str]], TmuxIO[A]]) -> None:
-        self.cmd = cmd
-        self.next = next
+    def __init__(self, duration: float) -> None:
+        super().__init__(Nil)
+        self.duration = duration
 
-    def step(self, tmux: Tmux) -> TmuxIO[A]:
+    def step(self, tmux: Tmux) -> TmuxIO[None]:
         return self
 
-    def _flat_map(self, f: Callable[[A], TmuxIO[B]]) -> TmuxIO[B]:
+
+class TmuxInvalidateCache(TmuxIO[None]):
+
+    def __init__(self) -> None:
+        super().__init__(Nil)
+
+    def step(self, tmux: Tmux) -> TmuxIO[None]:
         return self
 
 
@@ -361,10 +371,217 @@ class TmuxIOFatal(Generic[A], TmuxIO[A]):
         return self
 
 
-@do(TmuxIO[List[TmuxCmdResult]])
-def execute_cmds(writes: List[TmuxCmd], read: Maybe[TmuxCmd]) -> Do:
-    cmds = writes.cat_m(read)
-    yield TmuxIO.delay(__.execute_cmds(cmds))
+Interpreter = Generator[Union[List[TmuxCmd], TmuxSleep], Union[List[TmuxCmdResult], None], TResult[A]]
+
+
+class ReadCache:
+    '''successful results of query commands, keyed by command line, that are shared by all interpreters of a run.
+    When a batch is executed, the cache is cleared at every command that isn't a query, since it may have changed the
+    server state, and the results of the queries following it are stored.
+    Batches consisting only of cached queries are not sent to tmux; `hits` counts the commands served this way.
+    '''
+
+    def __init__(self) -> None:
+        self.results = dict()
+        self.hits = 0
+
+    def lookup(self, cmds: List[TmuxCmd]) -> Maybe[List[TmuxCmdResult]]:
+        if cmds.empty or cmds.exists(lambda a: a.cmdline not in self.results):
+            return Nothing
+        self.hits += cmds.length
+        return Just(cmds.map(lambda a: self.results[a.cmdline]))
+
+    def update(self, cmds: List[TmuxCmd], results: List[TmuxCmdResult]) -> None:
+        if results.length != cmds.length:
+            self.invalidate()
+        else:
+            for cmd, result in zip(cmds, results):
+                if not cmd.query:
+                    self.invalidate()
+                elif isinstance(result, TmuxCmdSuccess):
+                    self.results[cmd.cmdline] = result
+
+    def invalidate(self) -> None:
+        self.results.clear()
+
+
+def interpret(io: TmuxIO[A], tmux: Tmux, cache: ReadCache, writes: List[TmuxCmd]=Nil) -> Interpreter:
+    '''evaluate `io` until a command batch has to be sent to tmux, which is yielded to the driver.
+    The driver sends back the results of the batch, making the interpreter independent of whether the commands are
+    executed synchronously or by an event loop.
+    Sleeps are yielded to the driver as well, which sends back `None` when it has finished sleeping.
+    Binds are kept on a continuation stack, which is popped whenever a step produces a value.
+    Writes are accumulated and executed together with the next read or when the computation terminates.
+    Queries are answered from `cache` if possible.
+    '''
+    t = io
+    stack = []
+    while True:
+        if isinstance(t, FlatMap):
+            stack.append(t)
+            t = t.io
+        elif isinstance(t, Pure):
+            if stack:
+                t = stack.pop().cont(t.value)
+            elif writes.empty:
+                return TSuccess(t.value)
+            else:
+                t = execute_writes(writes).and_then(t)
+                writes = Nil
+        elif isinstance(t, Suspend):
+            t = t.step(tmux)
+        elif isinstance(t, TmuxWrite) and stack:
+            writes = writes.cat(t.cmd)
+            t = Pure(None)
+        elif isinstance(t, TmuxWrite):
+            t = execute_writes(writes.cat(t.cmd))
+            writes = Nil
+        elif isinstance(t, TmuxRead):
+            t = execute_read(writes, t.cmd)
+            writes = Nil
+        elif isinstance(t, TmuxExecute):
+            results = cache.lookup(t.cmds) | None
+            if results is None:
+                results = yield t.cmds
+                cache.update(t.cmds, results)
+            t = Pure(results)
+        elif isinstance(t, TmuxAttempt) and not writes.empty:
+            t = execute_writes(writes).and_then(t)
+            writes = Nil
+        elif isinstance(t, TmuxAttempt):
+            result = yield from interpret_result(t.io, tmux, cache)
+            t = Pure(result)
+        elif isinstance(t, TmuxPar) and t.ios.empty:
+            t = Pure(Nil)
+        elif isinstance(t, TmuxPar):
+            result = yield from interpret_par(t.ios, writes, tmux, cache)
+            writes = Nil
+            t = result_io(result)
+        elif isinstance(t, TmuxSleep):
+            yield t
+            t = Pure(None)
+        elif isinstance(t, TmuxInvalidateCache):
+            cache.invalidate()
+            t = Pure(None)
+        elif isinstance(t, TmuxIOError):
+            return TError(t.error)
+        elif isinstance(t, TmuxIOFatal):
+            return TFatal(t.exception)
+        else:
+            raise Exception(f'got invalid TmuxIO computation step result {t}')
+
+
+def interpret_result(io: TmuxIO[A], tmux: Tmux, cache: ReadCache) -> Interpreter:
+    '''pending writes of the enclosing computation are executed before the attempt, so that their failures aren't
+    captured by it.
+    '''
+    try:
+        return (yield from interpret(io, tmux, cache))
+    except TmuxIOException as e:
+        return TFatal(e)
+
+
+def result_io(result: TResult[A]) -> TmuxIO[A]:
+    return (
+        TmuxIO.pure(result.value)
+        if isinstance(result, TSuccess) else
+        TmuxIOError(result.error)
+        if isinstance(result, TError) else
+        TmuxIOFatal(result.exception)
+    )
+
+
+def dedupe_queries(cmds: List[TmuxCmd]) -> Tuple[List[TmuxCmd], List[int]]:
+    '''remove repeated queries that aren't separated by another command.
+    Returns the remaining commands and the index of the command whose result is used for each of the original ones.
+    '''
+    unique = []
+    index = []
+    seen = dict()
+    for cmd in cmds:
+        if not cmd.query:
+            seen.clear()
+        elif cmd.cmdline in seen:
+            index.append(seen[cmd.cmdline])
+            continue
+        else:
+            seen[cmd.cmdline] = len(unique)
+        index.append(len(unique))
+        unique.append(cmd)
+    return Lists.wrap(unique), Lists.wrap(index)
+
+
+def interpret_par(ios: List[TmuxIO[A]], writes: List[TmuxCmd], tmux: Tmux, cache: ReadCache) -> Interpreter:
+    '''interpret independent computations in lockstep.
+    Each branch is advanced until it requests a command batch; the batches of all branches are concatenated and sent
+    in a single round trip, and the results are split up again by the batch sizes.
+    Identical queries of different branches are only sent once.
+    Pending writes of the enclosing computation are passed to the first branch, so that they precede its commands.
+    An empty par isn't interpreted here, so that the pending writes remain with the enclosing computation.
+    If any branch fails, the first failure in order is the result.
+    Sleeps of the branches are passed to the driver one after the other.
+    '''
+    branches = ios.with_index.map2(lambda i, io: interpret(io, tmux, cache, writes if i == 0 else Nil))
+    results = [None] * branches.length
+    batches = []
+    def advance(i: int, interpreter: Interpreter, value: Any) -> None:
+        try:
+            batches.append((i, interpreter, interpreter.send(value)))
+        except StopIteration as e:
+            results[i] = e.value
+    for i, interpreter in enumerate(branches):
+        advance(i, interpreter, None)
+    while batches:
+        current = Lists.wrap(batches)
+        batches.clear()
+        for i, interpreter, sleep in current.filter(lambda a: isinstance(a[2], TmuxSleep)):
+            yield sleep
+            advance(i, interpreter, None)
+        current = current.filter(lambda a: not isinstance(a[2], TmuxSleep))
+        if current.empty:
+            continue
+        cmds = current.flat_map(lambda a: a[2])
+        unique, index = dedupe_queries(cmds)
+        unique_output = yield unique
+        complete = unique_output.length == unique.length
+        output = index.map(lambda i: unique_output[i]) if complete else unique_output
+        offset = 0
+        for i, interpreter, batch in current:
+            advance(i, interpreter, output.drop(offset).take(batch.length) if complete else output)
+            offset += batch.length
+    failure = Lists.wrap(results).find(lambda a: not isinstance(a, TSuccess))
+    return failure | (lambda: TSuccess(Lists.wrap(results).map(lambda a: a.value)))
+
+
+def execute_batches(interpreter: Interpreter, tmux: Tmux) -> TResult[A]:
+    try:
+        request = next(interpreter)
+        while True:
+            request = interpreter.send(
+                time.sleep(request.duration)
+                if isinstance(request, TmuxSleep) else
+                tmux.execute_cmds(request)
+            )
+    except StopIteration as e:
+        return e.value
+
+
+async def execute_batches_async(interpreter: Interpreter, tmux: Tmux) -> TResult[A]:
+    try:
+        request = next(interpreter)
+        while True:
+            response = await (
+                asyncio.sleep(request.duration)
+                if isinstance(request, TmuxSleep) else
+                tmux.execute_cmds_async(request)
+            )
+            request = interpreter.send(response)
+    except StopIteration as e:
+        return e.value
+
+
+def execute_cmds(writes: List[TmuxCmd], read: Maybe[TmuxCmd]) -> TmuxIO[List[TmuxCmdResult]]:
+    return TmuxExecute(writes.cat_m(read))
 
 
 def read_result(result: TmuxCmdResult) -> Either[List[str], List[str]]:
@@ -2,6 +2,8 @@ from amino import List, Maybe, Just
 from amino.io import IOExceptionBase
 from amino.util.trace import default_internal_packages
 
+internal_packages = default_internal_packages.cons('chiasma.io')
+
 
 class TmuxIOException(IOExceptionBase):
 
@@ -11,7 +13,7 @@ class TmuxIOException(IOExceptionBase):
 
     @property
     def internal_packages(self) -> Maybe[List[str]]:
-        return Just(default_internal_packages.cons('chiasma.io'))
+        return Just(internal_packages)
 
 
 __all__ = ('TmuxIOException',)
@@ -1,10 +1,11 @@
 from typing import TypeVar, Generic, Callable, Tuple
 
 from amino.case import Case
-from amino import Either, ADT, Right, Left, Dat, Nil, List
+from amino import Either, ADT, Right, Left, Dat, Nil, List, Map
 from amino.func import const
 
 from chiasma.data.view_tree import ViewTree, LayoutNode, PaneNode, SubUiNode
+from chiasma.data.zipper import ViewTreeZipper, Crumb, view_zipper, view_tree_index
 from chiasma.util.id import Ident, IdentSpec, ensure_ident_or_generate
 
 L = TypeVar('L')
@@ -137,6 +138,89 @@ def mod_pane(
     return mod_pane
 
 
+def mod_pane_ident(
+        spec: IdentSpec,
+        mod: Callable[[PaneNode[L, P]], PaneNode[L, P]],
+        layout: Callable[[LayoutNode[L, P], List[ModPaneResult[L, P]]], Either[str, LayoutNode[L, P]]]=None,
+) -> Callable[[ViewTree[L, P]], Either[str, ViewTree[L, P]]]:
+    '''like `mod_pane`, but locates the pane through the path index, so that only the layouts on the path to the
+    pane are rebuilt and passed to `layout`, with the results of their subtrees.
+    `mod` and `layout` must not change the idents of views or the structure of the tree, since the updated tree
+    inherits the index.
+    '''
+    ident = ensure_ident_or_generate(spec)
+    hook = layout or (lambda l, r: Right(l))
+    def climb(zipper: ViewTreeZipper[L, P], result: ModPaneResult[L, P]) -> ViewTree[L, P]:
+        def step(crumb: Crumb[L, P]) -> ViewTree[L, P]:
+            parent = zipper.up_with(crumb)
+            node = parent.focus
+            results = node.sub.with_index.map2(lambda i, a: result if i == crumb.index else NotFound(a))
+            updated = hook(node, results).get_or_strict(node)
+            return climb(parent.replace(updated), Found(updated))
+        return zipper.crumb.map(step) | zipper.focus
+    def mod_pane_ident(tree: ViewTree[L, P]) -> Either[str, ViewTree[L, P]]:
+        return (
+            view_zipper(tree, ident)
+            .flat_map(lambda z: z.pane.map(mod).map(lambda a: climb(z.replace(a), FoundHere(a))))
+            .map(lambda a: view_tree_index.inherit(tree, a))
+        )
+    return mod_pane_ident
+
+
+class mod_panes_step(Generic[L, P], Case[ViewTree[L, P], ModPaneResult[L, P]], alg=ViewTree):
+    '''layouts without updated panes are left untouched and aren't passed to the hook.
+    '''
+
+    def __init__(
+            self,
+            updates: Map[Ident, Callable[[PaneNode[L, P]], PaneNode[L, P]]],
+            layout: Callable[[LayoutNode[L, P], List[ModPaneResult[L, P]]], Either[str, LayoutNode[L, P]]],
+    ) -> None:
+        self.updates = updates
+        self.layout = layout
+        self.found = set()
+
+    def layout_node(self, node: LayoutNode[L, P]) -> ModPaneResult[L, P]:
+        results = node.sub.map(self)
+        def update() -> ModPaneResult[L, P]:
+            updated = node.set.sub(results.map(lambda a: layout_sub_result.match(a)[0]))
+            return Found(self.layout(updated, results).get_or_strict(updated))
+        return update() if results.exists(lambda a: not isinstance(a, NotFound)) else NotFound(node)
+
+    def pane_node(self, node: PaneNode[L, P]) -> ModPaneResult[L, P]:
+        ident = node.data.ident
+        def update(f: Callable[[PaneNode[L, P]], PaneNode[L, P]]) -> ModPaneResult[L, P]:
+            self.found.add(ident)
+            return FoundHere(f(node))
+        return self.updates.lift(ident).map(update) | NotFound(node)
+
+    def sub_ui_node(self, node: SubUiNode[L, P]) -> ModPaneResult[L, P]:
+        return NotFound(node)
+
+
+def mod_panes(
+        updates: Map[IdentSpec, Callable[[PaneNode[L, P]], PaneNode[L, P]]],
+        layout: Callable[[LayoutNode[L, P], List[ModPaneResult[L, P]]], Either[str, LayoutNode[L, P]]]=None,
+) -> Callable[[ViewTree[L, P]], Either[str, ViewTree[L, P]]]:
+    '''apply the updates to the panes with the given idents in a single traversal.
+    `layout` is called once for each layout containing updated panes, with the results of its subtrees.
+    Fails if one of the panes isn't in the tree.
+    The same restrictions as for `mod_pane_ident` apply to `updates` and `layout`.
+    '''
+    by_ident = Map((ensure_ident_or_generate(k), v) for k, v in updates.items())
+    hook = layout or (lambda l, r: Right(l))
+    def mod_panes(tree: ViewTree[L, P]) -> Either[str, ViewTree[L, P]]:
+        step = mod_panes_step(by_ident, hook)
+        result = step(tree)
+        missing = by_ident.k.filter(lambda a: a not in step.found)
+        return (
+            Right(view_tree_index.inherit(tree, layout_sub_result.match(result)[0]))
+            if missing.empty else
+            Left(f'no panes {missing.join_comma} in tree')
+        )
+    return mod_panes
+
+
 def match_ident(spec: IdentSpec) -> Callable[[ViewTree[L, P]], bool]:
     ident = ensure_ident_or_generate(spec)
     def match_ident(tree: ViewTree[L, P]) -> bool:
@@ -144,4 +228,4 @@ def match_ident(spec: IdentSpec) -> Callable[[ViewTree[L, P]], bool]:
     return match_ident
 
 
-__all__ = ('mod_pane',)
+__all__ = ('mod_pane', 'mod_pane_ident', 'mod_panes')
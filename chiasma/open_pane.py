@@ -1,13 +1,13 @@
 from typing import Callable, TypeVar
 
-from amino import List, Either, Right, Left
+from amino import List, Either, Right, Left, Map
 
 from amino.lenses.lens import lens
 from amino.boolean import true
 from amino.case import Case
 
 from chiasma.util.id import IdentSpec
-from chiasma.mod_pane import mod_pane, match_ident, ModPaneResult, FoundHere
+from chiasma.mod_pane import match_ident, ModPaneResult, FoundHere, mod_pane_ident, mod_panes
 from chiasma.data.view_tree import SubUiNode, ViewTree, LayoutNode, PaneNode
 from chiasma.ui.view import UiPane
 
@@ -64,7 +64,11 @@ pane_node_open = lens.data.open
 
 
 def ui_open_pane(spec: IdentSpec) -> Callable[[ViewTree[L, P]], Either[str, ViewTree[L, P]]]:
-    return mod_pane(mod_pane_open(spec, pane_node_open.set(true)), pane_open_layout_hook)
+    return mod_pane_ident(spec, pane_node_open.set(true), pane_open_layout_hook)
 
 
-__all__ = ('ui_open_pane', 'ui_toggle_pane',)
+def ui_open_panes(specs: List[IdentSpec]) -> Callable[[ViewTree[L, P]], Either[str, ViewTree[L, P]]]:
+    return mod_panes(Map((a, pane_node_open.set(true)) for a in specs), pane_open_layout_hook)
+
+
+__all__ = ('ui_open_pane', 'ui_toggle_pane', 'ui_open_panes',)
@@ -1,6 +1,6 @@
 from typing import TypeVar
 
-from amino import do, Do, __, Either, Boolean, _, Path
+from amino import do, Do, __, Either, Boolean, _, Path, List
 from amino.state import State
 from amino.boolean import false
 from amino.logging import module_log
@@ -55,32 +55,44 @@ def pane_id_fatal(pane: Pane) -> TS[D, str]:
     return TS.from_either(pane.id.to_either(lambda: f'pane has no id: {pane}'))
 
 
+def tpane_open(tpane: Pane) -> TmuxIO[Boolean]:
+    return tpane.id.cata(pane_open, lambda: TmuxIO.pure(false))
+
+
 @do(TS[Views, Boolean])
 def tmux_pane_open(pane: Ident) -> Do:
     tpane = yield pane_by_ident(pane)
-    yield TS.lift(tpane.id.cata(pane_open, lambda: TmuxIO.pure(false)))
+    yield TS.lift(tpane_open(tpane))
+
+
+def tpane_live(tpane: Pane, live: List[int]) -> bool:
+    return tpane.id.exists(live.contains)
 
 
 @do(TS[Views, Either[str, P]])
-def reference_pane(node: MeasuredLayoutNode) -> Do:
-    open = yield layout_panes(node).map(_.data.view).traverse(lambda p: tmux_pane_open(p.ident).map(__.m(p)), TS)
-    yield TS.pure(open.join.head.to_either(f'no open pane in layout'))
+def reference_pane(node: MeasuredLayoutNode, live: List[int]) -> Do:
+    '''the first pane of the layout that exists in tmux.
+    `live` contains the ids of the window's panes, which are queried once per packing pass.
+    '''
+    panes = layout_panes(node).map(_.data.view)
+    tpanes = yield panes.traverse(lambda p: pane_by_ident(p.ident), TS)
+    open = panes.zip(tpanes).find(lambda a: tpane_live(a[1], live))
+    yield TS.pure(open.map(lambda a: a[0]).to_either(f'no open pane in layout'))
 
 
 @do(TS[Views, None])
-def move_tmux_pane(pane: Ident, reference: Ident, vertical: Boolean) -> Do:
+def move_tmux_pane(pane: Ident, reference: Ident, vertical: Boolean, live: List[int]) -> Do:
     tpane = yield pane_by_ident(pane)
     ref_tpane = yield pane_by_ident(reference)
     id = yield pane_id_fatal(tpane)
     ref_id = yield pane_id_fatal(ref_tpane)
-    is_open = yield TS.lift(pane_open(id))
-    yield TS.lift(move_pane(id, ref_id, vertical)) if is_open else TS.pure(None)
+    yield TS.lift(move_pane(id, ref_id, vertical)) if live.contains(id) else TS.pure(None)
 
 
 @do(TS[Views, None])
-def pack_pane(pane: P, reference: P, vertical: Boolean) -> Do:
+def pack_pane(pane: P, reference: P, vertical: Boolean, live: List[int]) -> Do:
     if pane.open and pane != reference:
-        yield move_tmux_pane(pane.ident, reference.ident, vertical)
+        yield move_tmux_pane(pane.ident, reference.ident, vertical, live)
     yield TS.unit
 
 
@@ -89,9 +101,9 @@ def pane_by_ident(ident: Ident) -> TS[Views, Pane]:
 
 
 def pane_by_id(id: str) -> TS[Views, Either[str, Pane]]:
-    return TS.inspect(__.panes.find(__.id.contains(id)).to_either(lambda: f'no tmux pane for `{id}`'))
+    return TS.inspect(__.pane_by_id(id))
 
 
 __all__ = ('add_pane', 'find_or_create_pane', 'create_tmux_pane', 'ensure_pane_open', 'pane_id_fatal', 'tmux_pane_open',
            'reference_pane', 'ensure_pane_open', 'pane_id_fatal', 'tmux_pane_open', 'reference_pane', 'move_tmux_pane',
-           'pack_pane', 'pane_by_ident', 'pane_by_id')
+           'pack_pane', 'tpane_live', 'pane_by_ident', 'pane_by_id')
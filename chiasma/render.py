@@ -4,7 +4,10 @@ from amino.tc.context import context, Bindings
 from amino import do, Do
 from amino.logging import module_log
 
-from chiasma.window.main import pack_window, find_or_create_window, ensure_window, ensure_view, window_state
+from chiasma.window.main import (pack_window, find_or_create_window, ensure_window, ensure_view, window_state,
+                                 window_unchanged)
+from chiasma.data.window import Window
+from chiasma.io.compute import TmuxIO
 from chiasma.data.tmux import Views
 from chiasma.util.id import Ident
 from chiasma.data.view_tree import ViewTree
@@ -19,16 +22,47 @@ P = TypeVar('P')
 
 @context(**pack_window.bounds)
 @do(TS[Views, None])
-def render(bindings: Bindings, session_ident: Ident, window_ident: Ident, layout: ViewTree[LO, P]) -> Do:
-    log.debug(f'rendering window {window_ident}')
+def render_layout(
+        bindings: Bindings,
+        session_ident: Ident,
+        window_ident: Ident,
+        window: Window,
+        layout: ViewTree[LO, P],
+        verify: bool,
+) -> Do:
     session = yield find_or_create_session(session_ident).tmux
-    window = yield find_or_create_window(window_ident).tmux
     updated_session = yield ensure_session(session)
     yield ensure_window(updated_session, window, window_ident, layout)
     yield ensure_view(updated_session, window)(layout)
     ui_princ, t_princ = yield principal_pane(layout)
     ws = yield window_state(window_ident, window, layout)
-    yield pack_window(bindings)(updated_session, window, ui_princ)(ws)
+    yield pack_window(bindings)(updated_session, window, ui_princ, verify)(ws)
+
+
+@context(**pack_window.bounds)
+@do(TS[Views, None])
+def render(
+        bindings: Bindings,
+        session_ident: Ident,
+        window_ident: Ident,
+        layout: ViewTree[LO, P],
+        verify: bool=False,
+) -> Do:
+    '''create the tmux entities for a layout and arrange its panes.
+    If `verify` is set, the resulting pane geometry is compared to the measured layout and deviating panes are resized.
+    Otherwise, rendering is skipped if the layout and the window are unchanged since the last render.
+    '''
+    log.debug(f'rendering window {window_ident}')
+    window = yield find_or_create_window(window_ident).tmux
+    rendered = yield TS.inspect(lambda a: a.rendered.lift(window_ident))
+    unchanged = yield (
+        TS.lift(rendered.map(lambda a: window_unchanged(bindings)(window, a, layout)) | TmuxIO.pure(False))
+        if not verify else
+        TS.pure(False)
+    )
+    if unchanged:
+        log.debug(f'window {window_ident} is unchanged')
+    yield TS.unit if unchanged else render_layout(bindings)(session_ident, window_ident, window, layout, verify)
 
 
 __all__ = ('render',)
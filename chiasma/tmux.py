@@ -1,8 +1,11 @@
 import abc
+import asyncio
+from threading import Lock
+from collections import deque
+from typing import Tuple, TypeVar, Generic, Callable
 from subprocess import Popen, PIPE
 
-from amino import List, Lists, Map, Boolean, do, Either, Do, _, __, Try, Dat, ADT, Nil, Maybe
-from amino.boolean import false, true
+from amino import List, Lists, Map, do, Either, Do, _, __, Try, Dat, ADT, Nil, Maybe, Left, Right, Just, Nothing
 from amino.string.hues import blue, red
 
 from amino.logging import Logging
@@ -12,6 +15,8 @@ from chiasma.data.session import Session
 from chiasma.data.window import Window
 from chiasma.data.pane import Pane
 
+A = TypeVar('A')
+
 
 class POutput(ADT['POutput']):
 
@@ -27,6 +32,9 @@ class PError(POutput):
     pass
 
 
+query_cmds = ('show-options', 'show-window-options', 'show-environment', 'show-buffer', 'has-session')
+
+
 class TmuxCmd(Dat['TmuxCmd']):
 
     def __init__(self, cmd: str, args: List[str]) -> None:
@@ -37,6 +45,13 @@ class TmuxCmd(Dat['TmuxCmd']):
     def cmdline(self) -> str:
         return self.args.cons(self.cmd).join_tokens
 
+    @property
+    def query(self) -> bool:
+        '''whether the command only reports server state without changing it.
+        '''
+        return self.cmd.startswith('list-') or self.cmd in query_cmds or (self.cmd == 'display-message' and
+                                                                         '-p' in self.args)
+
 
 class TmuxCmdResult(ADT['TmuxCmdResult']):
     pass
@@ -63,37 +78,84 @@ class TmuxCmdFatal(TmuxCmdResult):
         self.output = output
 
 
-class PState(Dat['PState']):
-
-    def __init__(self, in_cmd: Boolean, current: List[str], cmds: List[POutput]) -> None:
-        self.in_cmd = in_cmd
-        self.current = current
-        self.cmds = cmds
-
-    def push(self, output: POutput) -> 'PState':
-        return self.append1.cmds(output).set.current(Nil).set.in_cmd(false)
-
-    def success(self) -> 'PState':
-        return self.push(PSuccess(self.current))
-
-    def error(self) -> 'PState':
-        return self.push(PError(self.current))
+class OutputBlock(Dat['OutputBlock']):
+    '''output of a single command, delimited by the guard lines `%begin <time> <number> <flags>` and
+    `%end`/`%error` with the same arguments.
+    The number is assigned by the server and increases with each command; flag `1` marks commands that were sent by
+    the control client that received the output.
+    '''
 
+    def __init__(self, number: int, flags: int, output: POutput) -> None:
+        self.number = number
+        self.flags = flags
+        self.output = output
 
-def parse_cmd_output(output: List[str]) -> List[str]:
-    def parse(z: PState, a: str) -> PState:
-        return (
-            z.set.in_cmd(true)
-            if a.startswith('%begin') else
-            z.success()
-            if a.startswith('%end') else
-            z.error()
-            if a.startswith('%error') else
-            z.append1.current(a)
-            if z.in_cmd else
-            z
-        )
-    return output.fold_left(PState(false, Nil, Nil))(parse).cmds.drop(1)
+    @property
+    def client(self) -> bool:
+        return self.flags & 1 == 1
+
+
+def guard_args(line: str) -> Tuple[int, int]:
+    tokens = line.split(' ')
+    number = int(tokens[2]) if len(tokens) > 2 and tokens[2].isdigit() else -1
+    flags = int(tokens[3]) if len(tokens) > 3 and tokens[3].isdigit() else 0
+    return number, flags
+
+
+class CmdOutputParser(Logging):
+    '''incremental parser for the output of a control mode client.
+    Data can be fed in arbitrary chunks as it arrives; incomplete lines are buffered until their newline is received.
+    A block is emitted as soon as the guard line closing it, i.e. `%end` or `%error` with the command number of the
+    `%begin` line, has been parsed, so only the lines of the current block are retained.
+    '''
+
+    def __init__(self) -> None:
+        self.partial = []
+        self.guard = None
+        self.current = []
+
+    def feed(self, data: bytes) -> List[OutputBlock]:
+        '''the chunks of an incomplete line are only joined once its newline arrives, so that long lines are copied
+        once rather than with every chunk.
+        '''
+        newline = data.rfind(b'\n')
+        if newline < 0:
+            if data:
+                self.partial.append(data)
+            return Nil
+        self.partial.append(data[:newline])
+        lines = b''.join(self.partial).split(b'\n')
+        rest = data[newline + 1:]
+        self.partial = [rest] if rest else []
+        blocks = []
+        for line in lines:
+            self.feed_line(line.decode(errors='replace')).foreach(blocks.append)
+        return Lists.wrap(blocks)
+
+    def feed_line(self, line: str) -> Maybe[OutputBlock]:
+        if self.guard is None:
+            if line.startswith('%begin'):
+                self.guard = guard_args(line)
+        elif self.closes_block(line):
+            return Just(self.close(line.startswith('%end')))
+        else:
+            self.current.append(line)
+        return Nothing
+
+    def closes_block(self, line: str) -> bool:
+        return (line.startswith('%end') or line.startswith('%error')) and guard_args(line)[0] == self.guard[0]
+
+    def close(self, success: bool) -> OutputBlock:
+        current = Lists.wrap(self.current)
+        number, flags = self.guard
+        self.guard = None
+        self.current = []
+        return OutputBlock(number, flags, PSuccess(current) if success else PError(current))
+
+
+def parse_cmd_blocks(output: List[str]) -> List[OutputBlock]:
+    parser = CmdOutputParser()
+    return output.flat_map(lambda a: parser.feed_line(a).to_list)
 
 
 class create_cmd_result(Case, alg=POutput):
@@ -108,20 +170,114 @@ class create_cmd_result(Case, alg=POutput):
         return TmuxCmdError(self.cmd, output)
 
 
+def cmd_results(cmds: List[TmuxCmd], outputs: List[POutput]) -> List[TmuxCmdResult]:
+    return cmds.zip(outputs).map2(lambda c, o: create_cmd_result(c)(o))
+
+
+class PendingBatch(Generic[A]):
+    '''`reused` indicates that the batch was sent to a client that had been attached before.
+    '''
+
+    def __init__(self, cmds: List[TmuxCmd], waiter: A, reused: bool) -> None:
+        self.cmds = cmds
+        self.waiter = waiter
+        self.reused = reused
+        self.outputs = []
+
+    @property
+    def complete(self) -> bool:
+        return len(self.outputs) >= self.cmds.length
+
+    @property
+    def lost(self) -> bool:
+        '''if a client that was already attached exits before producing any output for the batch, it has most likely
+        been detached by the server shutting down before the batch was sent, so the batch can be sent again to a new
+        client.
+        '''
+        return self.reused and not self.outputs
+
+    @property
+    def results(self) -> List[TmuxCmdResult]:
+        return cmd_results(self.cmds, Lists.wrap(self.outputs))
+
+
+class BlockCorrelation(Logging):
+    '''assigns the output blocks of a control mode client to the commands it sent.
+    Only blocks flagged as originating from the client are considered. Since the server numbers commands in the order
+    it receives them, the blocks are assigned to the pending batches in the order in which they were sent, which allows
+    multiple batches to be in flight at the same time.
+    Blocks whose number is not larger than the last one assigned are duplicates and are discarded.
+    '''
+
+    def __init__(self) -> None:
+        self.pending = deque()
+        self.number = -1
+
+    def push(self, cmds: List[TmuxCmd], waiter: A=None, reused: bool=False) -> PendingBatch[A]:
+        batch = PendingBatch(cmds, waiter, reused)
+        self.pending.append(batch)
+        return batch
+
+    def feed(self, blocks: List[OutputBlock]) -> List[PendingBatch[A]]:
+        completed = []
+        for block in blocks:
+            if block.client and block.number > self.number:
+                self.number = block.number
+                if self.pending:
+                    batch = self.pending[0]
+                    batch.outputs.append(block.output)
+                    if batch.complete:
+                        completed.append(self.pending.popleft())
+                else:
+                    self.log.debug(f'discarding output of command {block.number}: no pending batch')
+        return Lists.wrap(completed)
+
+    def abort(self) -> List[PendingBatch[A]]:
+        pending = Lists.wrap(self.pending)
+        self.pending.clear()
+        return pending
+
+
+def correlate_blocks(cmds: List[TmuxCmd], blocks: List[OutputBlock]) -> List[TmuxCmdResult]:
+    correlation = BlockCorrelation()
+    batch = correlation.push(cmds)
+    correlation.feed(blocks)
+    return batch.results
+
+
 def create_cmd_results(cmds: List[TmuxCmd], output: List[str]) -> List[TmuxCmdResult]:
-    return cmds.zip(parse_cmd_output(output)).map2(lambda c, o: create_cmd_result(c)(o))
+    return correlate_blocks(cmds, parse_cmd_blocks(output))
+
+
+read_chunk_size = 2 ** 16
+
+
+def cmd_input(cmds: List[TmuxCmd]) -> bytes:
+    return (cmds / _.cmdline).cat('').join_lines.encode()
+
+
+def tmux_args(socket: Maybe[str]) -> List[str]:
+    socket_args = socket / (lambda a: List('-L', a)) | Nil
+    return socket_args.cons('tmux') + List('-C', 'attach')
 
 
 class Tmux(Logging, abc.ABC):
 
     @staticmethod
-    def cons(socket: str=None) -> 'Tmux':
-        return NativeTmux(Maybe.optional(socket))
+    def cons(socket: str=None, persistent: bool=False) -> 'Tmux':
+        sock = Maybe.optional(socket)
+        return ControlTmux(sock) if persistent else NativeTmux(sock)
 
     @abc.abstractmethod
     def execute_cmds(self, cmds: List[TmuxCmd]) -> List[TmuxCmdResult]:
         ...
 
+    async def execute_cmds_async(self, cmds: List[TmuxCmd]) -> List[TmuxCmdResult]:
+        return await asyncio.get_running_loop().run_in_executor(None, self.execute_cmds, cmds)
+
+    def close(self) -> None:
+        pass
+
 
 class NativeTmux(Tmux):
 
@@ -129,19 +285,228 @@ class NativeTmux(Tmux):
         self.socket = socket
 
     def execute_cmds(self, cmds: List[TmuxCmd]) -> List[TmuxCmdResult]:
-        socket_args = self.socket / (lambda a: ['-L', a]) | []
-        proc = Popen(args=['tmux'] + socket_args + ['-C', 'attach'], stdin=PIPE, stdout=PIPE, stderr=PIPE,
-                     universal_newlines=True)
-        cmdlines = (cmds / _.cmdline).cat('').join_lines
-        stdout, stderr = proc.communicate(cmdlines)
-        results = create_cmd_results(cmds, Lists.lines(stdout))
+        proc = Popen(args=tmux_args(self.socket), stdin=PIPE, stdout=PIPE, stderr=PIPE)
+        stdout, stderr = proc.communicate(cmd_input(cmds))
+        results = correlate_blocks(cmds, CmdOutputParser().feed(stdout))
         return (
-            List(TmuxCmdFatal(cmds, PError(Lists.lines(stderr))))
+            List(TmuxCmdFatal(cmds, PError(Lists.lines(stderr.decode(errors='replace')))))
             if proc.returncode == 0 and results.empty else
             results
         )
 
 
+def fatal_results(cmds: List[TmuxCmd], err: List[str]) -> List[TmuxCmdResult]:
+    return List(TmuxCmdFatal(cmds, PError(err)))
+
+
+class ControlTmux(Tmux):
+    '''keeps a single control mode client attached to the server and sends all command batches through its stdin.
+    Output blocks are assigned to the commands of the batch by their command number, so the implicit output of the
+    `attach` command, notifications and the output of other clients are skipped.
+    If the client has exited, e.g. because the server was restarted, a new one is spawned for the next batch.
+    '''
+
+    def __init__(self, socket: Maybe[str]) -> None:
+        self.socket = socket
+        self.proc = None
+        self.parser = None
+        self.correlation = None
+        self.lock = Lock()
+
+    @property
+    def connected(self) -> bool:
+        return self.proc is not None and self.proc.poll() is None
+
+    def connect(self) -> Popen:
+        if not self.connected:
+            self.disconnect()
+            self.log.debug(f'attaching control mode client to tmux server `{self.socket | "default"}`')
+            self.proc = Popen(args=tmux_args(self.socket), stdin=PIPE, stdout=PIPE, stderr=PIPE)
+            self.parser = CmdOutputParser()
+            self.correlation = BlockCorrelation()
+        return self.proc
+
+    def disconnect(self) -> None:
+        if self.proc is not None:
+            proc, self.proc = self.proc, None
+            if proc.poll() is None:
+                proc.terminate()
+            proc.communicate()
+
+    def close(self) -> None:
+        with self.lock:
+            self.disconnect()
+
+    def send(self, cmds: List[TmuxCmd]) -> Popen:
+        cmdlines = cmd_input(cmds)
+        try:
+            proc = self.connect()
+            proc.stdin.write(cmdlines)
+            proc.stdin.flush()
+        except BrokenPipeError:
+            self.disconnect()
+            proc = self.connect()
+            proc.stdin.write(cmdlines)
+            proc.stdin.flush()
+        return proc
+
+    def receive(self, proc: Popen, batch: PendingBatch) -> Either[List[str], List[TmuxCmdResult]]:
+        while not batch.complete:
+            data = proc.stdout.read1(read_chunk_size)
+            if not data:
+                self.proc = None
+                stdout, stderr = proc.communicate()
+                return Left(Lists.lines(stderr.decode(errors='replace')))
+            self.correlation.feed(self.parser.feed(data))
+        return Right(batch.results)
+
+    def roundtrip(self, cmds: List[TmuxCmd], retry: bool
+                  ) -> Tuple[PendingBatch, Either[List[str], List[TmuxCmdResult]]]:
+        reused = self.connected and not retry
+        proc = self.send(cmds)
+        batch = self.correlation.push(cmds, reused=reused)
+        return batch, self.receive(proc, batch)
+
+    def execute_cmds(self, cmds: List[TmuxCmd]) -> List[TmuxCmdResult]:
+        '''a lost batch is retried once with a new client.
+        '''
+        with self.lock:
+            batch, output = self.roundtrip(cmds, False)
+            if output.is_left and batch.lost:
+                self.log.debug('control mode client exited before executing the batch, reconnecting')
+                batch, output = self.roundtrip(cmds, True)
+        return output.value_or(lambda err: fatal_results(cmds, err))
+
+
+class AsyncTmux(Tmux):
+    '''control mode client for use with asyncio.
+    The client process is spawned with `asyncio.create_subprocess_exec` on the first batch and stays attached.
+    A reader task parses its output and resolves the future of each batch when all of its results have arrived, so
+    batches from concurrent tasks are pipelined: the lock is only held while writing a batch to the client's stdin.
+    The synchronous `execute_cmds` falls back to a one-shot client.
+    '''
+
+    def __init__(self, socket: Maybe[str]) -> None:
+        self.socket = socket
+        self.proc = None
+        self.correlation = None
+        self.reader = None
+        self.lock = asyncio.Lock()
+
+    @staticmethod
+    def cons(socket: str=None) -> 'AsyncTmux':
+        return AsyncTmux(Maybe.optional(socket))
+
+    @property
+    def connected(self) -> bool:
+        return self.proc is not None and self.proc.returncode is None
+
+    async def connect(self) -> asyncio.subprocess.Process:
+        if not self.connected:
+            await self.disconnect()
+            self.log.debug(f'attaching async control mode client to tmux server `{self.socket | "default"}`')
+            self.proc = await asyncio.create_subprocess_exec(*tmux_args(self.socket), stdin=PIPE, stdout=PIPE,
+                                                             stderr=PIPE)
+            self.correlation = BlockCorrelation()
+            self.reader = asyncio.ensure_future(self.read(self.proc, self.correlation))
+        return self.proc
+
+    async def read(self, proc: asyncio.subprocess.Process, correlation: BlockCorrelation) -> None:
+        '''when the client exits, the pending batches fail with its error output.
+        If reading fails, the exception is set on the pending batches, and if the reader is cancelled, they are
+        cancelled as well, so that no waiter is left unresolved.
+        '''
+        try:
+            parser = CmdOutputParser()
+            while True:
+                data = await proc.stdout.read(read_chunk_size)
+                if not data:
+                    break
+                for batch in correlation.feed(parser.feed(data)):
+                    if not batch.waiter.done():
+                        batch.waiter.set_result(Right(batch.results))
+            if self.proc is proc:
+                self.proc = None
+            err = Lists.lines((await proc.stderr.read()).decode(errors='replace'))
+            await proc.wait()
+            self.abort(correlation, lambda a: a.set_result(Left(err)))
+        except asyncio.CancelledError:
+            self.abort(correlation, lambda a: a.cancel())
+            raise
+        except Exception as e:
+            self.log.debug(f'async control mode client reader failed: {e}')
+            if proc.returncode is None:
+                proc.terminate()
+            await proc.communicate()
+            self.abort(correlation, lambda a: a.set_exception(e))
+        finally:
+            if self.proc is proc:
+                self.proc = None
+
+    def abort(self, correlation: BlockCorrelation, resolve: Callable[[asyncio.Future], None]) -> None:
+        for batch in correlation.abort():
+            if not batch.waiter.done():
+                resolve(batch.waiter)
+
+    async def disconnect(self) -> None:
+        if self.proc is not None:
+            proc, self.proc = self.proc, None
+            if proc.returncode is None:
+                proc.terminate()
+            await self.reader
+
+    async def close_async(self) -> None:
+        async with self.lock:
+            await self.disconnect()
+
+    def close(self) -> None:
+        '''if the loop of the reader isn't running anymore, the cancelled reader is awaited on it.
+        '''
+        if self.proc is not None and self.proc.returncode is None:
+            self.proc.terminate()
+        self.proc = None
+        reader, self.reader = self.reader, None
+        if reader is not None and not reader.done():
+            reader.cancel()
+            loop = reader.get_loop()
+            if not loop.is_running() and not loop.is_closed():
+                loop.run_until_complete(asyncio.gather(reader, return_exceptions=True))
+
+    async def send(self, cmds: List[TmuxCmd], retry: bool) -> PendingBatch[asyncio.Future]:
+        '''if writing to the client fails, its pending batches are aborted by the reader and the batch is pushed
+        again for a new client.
+        '''
+        cmdlines = cmd_input(cmds)
+        loop = asyncio.get_running_loop()
+        async with self.lock:
+            reused = self.connected and not retry
+            await self.connect()
+            batch = self.correlation.push(cmds, loop.create_future(), reused)
+            try:
+                self.proc.stdin.write(cmdlines)
+                await self.proc.stdin.drain()
+            except (BrokenPipeError, ConnectionResetError):
+                await self.disconnect()
+                await self.connect()
+                batch = self.correlation.push(cmds, loop.create_future())
+                self.proc.stdin.write(cmdlines)
+                await self.proc.stdin.drain()
+        return batch
+
+    async def execute_cmds_async(self, cmds: List[TmuxCmd]) -> List[TmuxCmdResult]:
+        '''a lost batch is retried once with a new client.
+        '''
+        batch = await self.send(cmds, False)
+        output = await batch.waiter
+        if output.is_left and batch.lost:
+            self.log.debug('async control mode client exited before executing the batch, reconnecting')
+            output = await (await self.send(cmds, True)).waiter
+        return output.value_or(lambda err: fatal_results(cmds, err))
+
+    def execute_cmds(self, cmds: List[TmuxCmd]) -> List[TmuxCmdResult]:
+        return NativeTmux(self.socket).execute_cmds(cmds)
+
+
 class PureTmux(Tmux):
 
     def __init__(self, _sessions: List[Session], _windows: List[Window], _panes: List[Pane]) -> None:
@@ -152,4 +517,4 @@ class PureTmux(Tmux):
     def execute_cmds(self, cmds: List[TmuxCmd]) -> List[TmuxCmdResult]:
         return Nil
 
-__all__ = ('Tmux',)
+__all__ = ('Tmux', 'NativeTmux', 'ControlTmux', 'AsyncTmux')
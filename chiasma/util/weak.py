@@ -0,0 +1,31 @@
+import weakref
+from typing import TypeVar, Generic
+
+from amino import Maybe
+
+A = TypeVar('A')
+B = TypeVar('B')
+
+
+class WeakIdentityMap(Generic[A, B]):
+    '''values associated with objects by identity, held for as long as the objects exist.
+    Unlike `weakref.WeakKeyDictionary`, the objects don't have to be hashable.
+    '''
+
+    def __init__(self) -> None:
+        self.entries = dict()
+
+    def store(self, obj: A, value: B) -> B:
+        key = id(obj)
+        def remove(ref: weakref.ref) -> None:
+            if self.entries.get(key, (None,))[0] is ref:
+                del self.entries[key]
+        self.entries[key] = weakref.ref(obj, remove), value
+        return value
+
+    def lookup(self, obj: A) -> Maybe[B]:
+        ref, value = self.entries.get(id(obj), (None, None))
+        return Maybe.optional(value if ref is not None and ref() is obj else None)
+
+
+__all__ = ('WeakIdentityMap',)
@@ -1,23 +1,27 @@
 from typing import TypeVar
 
 from amino.state import State
-from amino import do, Do, __, Either, L, _, Boolean, ADT, IO, Path
+from amino import do, Do, __, Either, L, _, Boolean, ADT, IO, Path, Map, Maybe, List, Nil
 from amino.case import Case
 from amino.logging import module_log
 from amino.tc.context import context, Bindings
 
 from chiasma.data.tmux import Views
-from chiasma.data.window import Window
+from chiasma.data.window import Window, RenderedWindow
 from chiasma.util.id import Ident
 from chiasma.commands.window import WindowData, create_window, session_window, window
 from chiasma.data.session import Session
-from chiasma.data.view_tree import LayoutNode, ViewTree, PaneNode, layout_panes, find_pane, SubUiNode
+from chiasma.data.view_tree import LayoutNode, ViewTree, PaneNode, layout_panes, SubUiNode, tree_panes, tree_hash
+from chiasma.data.zipper import indexed_pane
 from chiasma.window.principal import sync_principal
 from chiasma.io.compute import TmuxIO
-from chiasma.pane import (find_or_create_pane, ensure_pane_open, pack_pane, pane_by_ident, pane_id_fatal,
-                          reference_pane, pane_by_id, ensure_pane_closed)
-from chiasma.commands.pane import pane_from_data, resize_pane, PaneData, window_panes
-from chiasma.window.measure import MeasuredLayoutNode, MeasuredPaneNode, measure_view_tree, MeasuredView
+from chiasma.pane import find_or_create_pane, pack_pane, pane_by_ident, pane_id_fatal, reference_pane, pane_by_id
+from chiasma.commands.pane import (pane_from_data, resize_pane, PaneData, window_panes, close_pane,
+                                   create_pane_from_data)
+from chiasma.window.measure import (MeasuredLayoutNode, MeasuredPaneNode, measure_view_tree, MeasuredView,
+                                    MeasureTree)
+from chiasma.window.tmux_layout import apply_tree_layout
+from chiasma.window.verify import verify_window
 from chiasma.data.pane import Pane
 from chiasma.io.state import TS
 from chiasma.ui.view import UiPane
@@ -73,6 +77,26 @@ def pane_dir(pane: P) -> Do:
     yield (ui_pane.cwd(pane) / TmuxIO.pure).get_or(lambda: TmuxIO.from_io(IO.delay(Path.cwd)))
 
 
+@do(TS[Views, None])
+def ensure_panes(window: Window, panes: List[P]) -> Do:
+    '''open and close the tmux panes of a window according to the state of the views.
+    The panes are looked up in one batch, and all missing panes are created in another one, parsing the output of all
+    `split-window` commands at once.
+    '''
+    tpanes = yield panes.traverse(lambda a: find_or_create_pane(a.ident).tmux, TS)
+    existing = yield TS.lift(TmuxIO.traverse_par(tpanes, L(pane_from_data)(window, _)))
+    states = panes.zip(tpanes, existing)
+    closing = states.filter(lambda a: not a[0].open).flat_map(lambda a: a[2].to_list)
+    yield TS.lift(closing.traverse(close_pane, TmuxIO))
+    missing = states.filter(lambda a: a[0].open and a[2].is_left)
+    dirs = yield TS.lift(missing.traverse(lambda a: pane_dir(a[0]), TmuxIO))
+    if missing:
+        log.debug(f'creating tmux panes {missing.map(lambda a: a[1])} in {window}')
+    create = lambda a: create_pane_from_data(window, a[0][1], a[1])
+    created = yield TS.lift(TmuxIO.traverse_par(missing.zip(dirs), create)) if missing else TS.pure(Nil)
+    yield missing.zip(created).traverse(lambda a: TS.modify(__.set_pane_id(a[0][1], a[1].id)), TS)
+
+
 class ensure_view(Case[ViewTree[LO, P], TS[Views, None]], alg=ViewTree):
     '''synchronize a Views window to tmux.
     After this step, all missing tmux entities are considered fatal.
@@ -82,21 +106,11 @@ class ensure_view(Case[ViewTree[LO, P], TS[Views, None]], alg=ViewTree):
         self.session = session
         self.window = window
 
-    @do(TS[Views, None])
-    def layout_node(self, layout: LayoutNode[LO, P]) -> Do:
-        yield layout.sub.traverse(self, TS)
+    def layout_node(self, layout: LayoutNode[LO, P]) -> TS[Views, None]:
+        return ensure_panes(self.window, tree_panes()(layout))
 
-    @do(TS[Views, None])
-    def pane_node(self, node: PaneNode[LO, P]) -> Do:
-        pane = node.data
-        tpane = yield find_or_create_pane(node.data.ident).tmux
-        tpane1 = yield TS.lift(pane_from_data(self.window, tpane))
-        dir = yield TS.lift(pane_dir(pane))
-        yield (
-            ensure_pane_open(self.window, tpane, tpane1, dir)
-            if pane.open else
-            ensure_pane_closed(self.window, tpane, tpane1)
-        )
+    def pane_node(self, node: PaneNode[LO, P]) -> TS[Views, None]:
+        return ensure_panes(self.window, List(node.data))
 
     def sub_ui_node(self, node: SubUiNode[LO, P]) -> TS[Views, None]:
         return TS.unit
@@ -104,18 +118,19 @@ class ensure_view(Case[ViewTree[LO, P], TS[Views, None]], alg=ViewTree):
 
 class position_view(Case, alg=ViewTree):
 
-    def __init__(self, vertical: Boolean, reference: Ident) -> None:
+    def __init__(self, vertical: Boolean, reference: Ident, live: List[int]) -> None:
         self.vertical = vertical
         self.reference = reference
+        self.live = live
 
     @do(TS[Views, None])
     def layout_node(self, node: MeasuredLayoutNode[LO, P]) -> Do:
         pane = layout_panes(node).head
-        yield pane / _.data.view / L(pack_pane)(_, self.reference, self.vertical) | TS.unit
+        yield pane / _.data.view / L(pack_pane)(_, self.reference, self.vertical, self.live) | TS.unit
 
     @do(TS[Views, None])
     def pane_node(self, node: MeasuredPaneNode) -> Do:
-        yield pack_pane(node.data.view, self.reference, self.vertical)
+        yield pack_pane(node.data.view, self.reference, self.vertical, self.live)
         yield TS.unit
 
     def sub_ui_node(self, node: SubUiNode[L, P]) -> TS[Views, None]:
@@ -133,13 +148,14 @@ def resize_view_with(mview: MeasuredView[A], pane_ident: Ident, vertical: bool)
 
 class resize_view(Case, alg=ViewTree):
 
-    def __init__(self, vertical: Boolean, reference: Ident) -> None:
+    def __init__(self, vertical: Boolean, reference: Ident, live: List[int]) -> None:
         self.vertical = vertical
         self.reference = reference
+        self.live = live
 
     @do(TS[Views, None])
     def layout_node(self, node: MeasuredLayoutNode) -> Do:
-        layout_reference = yield reference_pane(node)
+        layout_reference = yield reference_pane(node, self.live)
         reference = yield TS.from_either(layout_reference)
         yield resize_view_with(node.data, reference.ident, self.vertical)
 
@@ -153,20 +169,25 @@ class resize_view(Case, alg=ViewTree):
 
 # TODO sort views by `position` attr before positioning
 class pack_tree(Case, alg=ViewTree):
+    '''arrange a layout with `move-pane` and `resize-pane`.
+    `live` contains the ids of the window's panes, which are queried once before packing, since moving panes doesn't
+    change it.
+    '''
 
-    def __init__(self, session: Session, window: Window, principal: Ident) -> None:
+    def __init__(self, session: Session, window: Window, principal: Ident, live: List[int]) -> None:
         self.session = session
         self.window = window
         self.principal = principal
+        self.live = live
 
     @do(TS[Views, None])
     def layout_node(self, node: MeasuredLayoutNode, reference: P) -> Do:
         vertical = node.data.view.vertical
-        layout_reference = yield reference_pane(node)
+        layout_reference = yield reference_pane(node, self.live)
         new_reference = layout_reference | reference
-        yield node.sub.traverse(position_view(vertical, new_reference), TS)
+        yield node.sub.traverse(position_view(vertical, new_reference, self.live), TS)
         yield node.sub.traverse(L(self)(_, new_reference), TS)
-        yield node.sub.traverse(resize_view(vertical, new_reference.ident), TS)
+        yield node.sub.traverse(resize_view(vertical, new_reference.ident, self.live), TS)
         yield TS.unit
 
     @do(TS[Views, None])
@@ -177,6 +198,77 @@ class pack_tree(Case, alg=ViewTree):
         return TS.unit
 
 
+def node_key(node: ViewTree) -> tuple:
+    return type(node), node.data.view.ident
+
+
+def layout_intact(node: MeasuredLayoutNode, previous: ViewTree, views: Views, pane_ids: Map[Ident, int]) -> bool:
+    '''whether the open views of a layout are the same as when it was last packed, without considering sublayouts.
+    A pane that has been recreated since then has a different tmux id and has not been moved to its position yet.
+    '''
+    def same_pane(pane: MeasuredPaneNode) -> bool:
+        ident = pane.data.view.ident
+        return views.pane_by_ident(ident).to_maybe.flat_map(_.id) == pane_ids.lift(ident)
+    return (
+        isinstance(previous, LayoutNode) and
+        node.data.view.ident == previous.data.view.ident and
+        node.data.view.vertical == previous.data.view.vertical and
+        node.sub.map(node_key) == previous.sub.map(node_key) and
+        layout_panes(node).forall(same_pane)
+    )
+
+
+class repack_tree(Case, alg=ViewTree):
+    '''pack only those parts of a layout that differ from the previously rendered tree.
+    Layouts whose open views changed are packed from scratch with `pack_tree`, while intact layouts only get resized,
+    and only if the measures of one of their views changed or a sublayout was modified.
+    The result indicates whether anything was changed in the node's subtree.
+    '''
+
+    def __init__(
+            self,
+            session: Session,
+            window: Window,
+            principal: Ident,
+            pane_ids: Map[Ident, int],
+            live: List[int],
+    ) -> None:
+        self.session = session
+        self.window = window
+        self.principal = principal
+        self.pane_ids = pane_ids
+        self.live = live
+
+    @do(TS[Views, bool])
+    def layout_node(self, node: MeasuredLayoutNode, previous: ViewTree, reference: P) -> Do:
+        intact = yield TS.inspect(L(layout_intact)(node, previous, _, self.pane_ids))
+        yield self.update(node, previous, reference) if intact else self.repack(node, reference)
+
+    def pane_node(self, node: PaneNode, previous: ViewTree, reference: P) -> TS[Views, bool]:
+        return TS.pure(False)
+
+    def sub_ui_node(self, node: SubUiNode[L, P], previous: ViewTree, reference: P) -> TS[Views, bool]:
+        return TS.pure(False)
+
+    @do(TS[Views, bool])
+    def repack(self, node: MeasuredLayoutNode, reference: P) -> Do:
+        yield pack_tree(self.session, self.window, self.principal, self.live)(node, reference)
+        return True
+
+    @do(TS[Views, bool])
+    def update(self, node: MeasuredLayoutNode, previous: MeasuredLayoutNode, reference: P) -> Do:
+        vertical = node.data.view.vertical
+        layout_reference = yield reference_pane(node, self.live)
+        new_reference = layout_reference | reference
+        subs = node.sub.zip(previous.sub)
+        modified = yield subs.traverse(lambda a: self(a[0], a[1], new_reference), TS)
+        measured = subs.exists(lambda a: a[0].data.measures != a[1].data.measures)
+        changed = measured or modified.exists(lambda a: a)
+        if changed:
+            yield node.sub.traverse(resize_view(vertical, new_reference.ident, self.live), TS)
+        return changed
+
+
 class WindowState(ADT['WindowState']):
     pass
 
@@ -217,14 +309,63 @@ def window_state(ui_window: Ident, twindow: Window, layout: ViewTree) -> Do:
     yield TS.pure(state)
 
 
+@context(**measure_view_tree.bounds)
+def window_unchanged(bindings: Bindings, twindow: Window, rendered: RenderedWindow, layout: ViewTree) -> TmuxIO[bool]:
+    '''whether `layout` is the one that was last rendered into the window, the window still has the same size and
+    contains exactly the panes that were open at that time.
+    Both queries are sent in one batch.
+    '''
+    open_ids = tree_panes()(layout).filter(_.open).flat_map(lambda a: rendered.pane_ids.lift(a.ident))
+    def unchanged(data: Either[str, WindowData], panes: List[PaneData]) -> bool:
+        size = data.map(lambda a: (int(a.width), int(a.height)) == (rendered.width, rendered.height)) | False
+        return size and sorted(panes.map(_.id)) == sorted(open_ids)
+    def query(wid: int) -> TmuxIO[bool]:
+        return TmuxIO.par(List(window(wid), window_panes(wid))).map(lambda a: unchanged(*a))
+    return (
+        twindow.id.map(query).get_or(lambda: TmuxIO.pure(False)).recover_error(lambda err: False)
+        if tree_hash(bindings)(layout) == rendered.layout_hash else
+        TmuxIO.pure(False)
+    )
+
+
+@do(TS[Views, None])
+def pack_measured(
+        session: Session,
+        window: Window,
+        principal: Ident,
+        win: TrackedWindow,
+        measure_tree: MeasureTree,
+        previous: Maybe[RenderedWindow],
+        pane_ids: Map[Ident, int],
+        ref: P,
+) -> Do:
+    '''arrange the window with a tmux layout string if possible.
+    If that fails, fall back to `move-pane` and `resize-pane`, restricted to the parts of the layout that changed since
+    the previous render.
+    '''
+    @do(TS[Views, None])
+    def fallback(error: str) -> Do:
+        log.debug(f'packing window {win.ui_window} with single commands: {error}')
+        panes = yield TS.lift(window_panes(win.native_window.id))
+        live = panes.map(_.id)
+        def repack(rendered: RenderedWindow) -> TS[Views, bool]:
+            return repack_tree(session, window, principal, rendered.pane_ids, live)(measure_tree, rendered.tree, ref)
+        yield previous.map(repack).get_or(lambda: pack_tree(session, window, principal, live)(measure_tree, ref))
+    native = win.native_window
+    io = apply_tree_layout(native.id, measure_tree, native.width, native.height, pane_ids)
+    yield TS.lift(io.map(lambda a: TS.unit).recover_error(fallback)).join
+
+
 @context(**measure_view_tree.bounds)
 class pack_window(Case, alg=WindowState):
 
-    def __init__(self, bindings: Bindings, session: Session, window: Window, principal: Ident) -> None:
+    def __init__(self, bindings: Bindings, session: Session, window: Window, principal: Ident, verify: bool=False
+                 ) -> None:
         self.bindings = bindings
         self.session = session
         self.window = window
         self.principal = principal
+        self.verify = verify
 
     @do(TS[Views, None])
     def pristine_window(self, win: PristineWindow) -> Do:
@@ -233,16 +374,25 @@ class pack_window(Case, alg=WindowState):
 
     @do(TS[Views, None])
     def tracked_window(self, win: TrackedWindow) -> Do:
-        ref = yield TS.from_either(find_pane(win.pane.ident)(win.layout))
+        ref = yield TS.from_either(indexed_pane(win.layout, win.pane.ident))
         width, height = int(win.native_window.width), int(win.native_window.height)
         measure_tree = measure_view_tree(self.bindings)(win.layout, width, height)
-        yield pack_tree(self.session, self.window, self.principal)(measure_tree, ref)
+        rendered = yield TS.inspect(lambda a: a.rendered.lift(win.ui_window))
+        previous = rendered.filter(lambda a: (a.width, a.height) == (width, height))
+        pane_ids = yield TS.inspect(__.pane_ids())
+        intact = previous.exists(lambda a: a.tree == measure_tree and a.pane_ids == pane_ids)
+        if not intact:
+            yield pack_measured(self.session, self.window, self.principal, win, measure_tree, previous, pane_ids, ref)
+        current = RenderedWindow(measure_tree, pane_ids, width, height, tree_hash(self.bindings)(win.layout))
+        yield TS.modify(__.set_rendered(win.ui_window, current))
+        if self.verify:
+            yield TS.lift(verify_window(win.native_window.id, measure_tree, width, height, pane_ids))
 
 
 def window_by_ident(ident: Ident) -> TS[Views, Window]:
     return TS.inspect_either(lambda a: a.window_by_ident(ident))
 
 
-__all__ = ('add_window', 'find_or_create_window', 'create_tmux_window', 'ensure_window', 'ensure_view', 'position_view',
-           'resize_view', 'pack_tree', 'WindowState', 'PristineWindow', 'TrackedWindow', 'window_state', 'pack_window',
-           'window_by_ident',)
+__all__ = ('add_window', 'find_or_create_window', 'create_tmux_window', 'ensure_window', 'ensure_panes', 'ensure_view',
+           'position_view', 'resize_view', 'pack_tree', 'repack_tree', 'WindowState', 'PristineWindow', 'TrackedWindow',
+           'window_state', 'window_unchanged', 'pack_measured', 'pack_window', 'window_by_ident',)
@@ -1,8 +1,11 @@
-from typing import Callable, Generic, TypeVar
+from typing import Callable, Generic, TypeVar, Tuple
+import math
 import operator
+from itertools import accumulate
+from collections import OrderedDict
 
 from amino.case import Case
-from amino import Either, Dat, _, List, Boolean, Maybe, Nil, Just, __, Left
+from amino import Either, Dat, _, List, Boolean, Maybe, Nil, Just, __, Left, Lists, Nothing
 from amino.logging import module_log
 from amino.tc.context import context, Bindings
 
@@ -11,12 +14,19 @@ from chiasma.ui.view import UiPane, UiLayout, UiView
 from chiasma.ui.view_geometry import ViewGeometry
 from chiasma.ui.state import ViewState
 
+try:
+    from chiasma.window.measure_numpy import balance_sizes_numpy
+except ImportError:
+    balance_sizes_numpy = None
+
 log = module_log()
 A = TypeVar('A')
 B = TypeVar('B')
 P = TypeVar('P')
 L = TypeVar('L')
 V = TypeVar('V')
+# layouts with at least this many open views are measured with numpy if it is installed
+numpy_min_views = 8
 
 
 class Measures(Dat['Measures']):
@@ -75,47 +85,151 @@ def measure_layout_views(views: List[ViewMeasureData], total: float) -> List[flo
     min_s = actual_min_sizes(views) / in_cells
     max_s = actual_max_sizes(views) / __.map(in_cells)
     minimized = views.map(lambda a: a.state.minimized)
-    return balance_sizes(min_s, max_s, view_weights(views), minimized, cells) / round
+    balance = (
+        balance_sizes_numpy
+        if balance_sizes_numpy is not None and views.length >= numpy_min_views else
+        balance_sizes
+    )
+    return balance(min_s, max_s, view_weights(views), minimized, cells) / round
+
+
+class MeasureKey(Dat['MeasureKey']):
+    '''structure of a subtree as nested tuples, covering everything that measuring it depends on: the geometry, state
+    and orientation of its views and which panes are open.
+    '''
+
+    def __init__(self, structure: tuple, open: bool) -> None:
+        self.structure = structure
+        self.open = open
+
+
+KeyTree = ViewTree[MeasureKey, MeasureKey]
+
+
+@context(P=UiPane)
+class measure_keys(Case[ViewTree, KeyTree], alg=ViewTree):
+
+    def __init__(self, bindings: Bindings) -> None:
+        self.bindings = bindings
+        self.view_data = measure_data(V=bindings.bindings['P'])
+
+    def pane_node(self, node: PaneNode[A, P]) -> KeyTree:
+        open = bool(node.data.open)
+        return ViewTree.pane(MeasureKey(('pane', self.view_data(node.data), open), open))
+
+    def layout_node(self, node: LayoutNode[A, P]) -> KeyTree:
+        sub = node.sub.map(self)
+        sub_structure = tuple(sub.map(lambda a: a.data.structure))
+        structure = 'layout', self.view_data(node.data), bool(node.data.vertical), sub_structure
+        return ViewTree.layout(MeasureKey(structure, sub.exists(lambda a: a.data.open)), sub)
+
+    def sub_ui_node(self, node: SubUiNode[L, P]) -> KeyTree:
+        '''the contents of a sub ui are unknown, so its key is unique and subtrees containing it are never reused.
+        '''
+        return ViewTree.pane(MeasureKey(('sub_ui', object()), True))
+
+
+class MeasureCache:
+    '''measured subtrees, keyed by their structure and the size they were measured for.
+    The least recently used entries are discarded when `size` is exceeded.
+    '''
+
+    def __init__(self, size: int) -> None:
+        self.size = size
+        self.trees = OrderedDict()
+        self.hits = 0
+
+    def lookup(self, key: Tuple[tuple, float, float]) -> Maybe[MeasureTree]:
+        tree = self.trees.get(key)
+        if tree is None:
+            return Nothing
+        self.hits += 1
+        self.trees.move_to_end(key)
+        return Just(tree)
+
+    def store(self, key: Tuple[tuple, float, float], tree: MeasureTree) -> MeasureTree:
+        self.trees[key] = tree
+        self.trees.move_to_end(key)
+        if len(self.trees) > self.size:
+            self.trees.popitem(last=False)
+        return tree
+
+    def clear(self) -> None:
+        self.trees.clear()
+
+
+measure_cache = MeasureCache(512)
+
+
+def open_subtrees(node: LayoutNode[A, P], key: KeyTree) -> List[Tuple[ViewTree[A, P], KeyTree]]:
+    return node.sub.zip(key.sub).filter(lambda a: a[1].data.open)
+
+
+class graft_views(Case[MeasureTree, MeasureTree], alg=ViewTree):
+    '''combine a cached measure tree with the views of the structurally equal subtree that is being measured.
+    '''
+
+    def pane_node(self, cached: MeasuredPaneNode, node: ViewTree[A, P], key: KeyTree, measures: Measures
+                  ) -> MeasureTree:
+        return ViewTree.pane(MeasuredView(node.data, measures))
+
+    def layout_node(self, cached: MeasuredLayoutNode, node: LayoutNode[A, P], key: KeyTree, measures: Measures
+                    ) -> MeasureTree:
+        sub = cached.sub.zip(open_subtrees(node, key)).map2(lambda c, a: self(c, a[0], a[1], c.data.measures))
+        return ViewTree.layout(MeasuredView(node.data, measures), sub)
+
+    def sub_ui_node(self, cached: SubUiNode, node: ViewTree[A, P], key: KeyTree, measures: Measures) -> MeasureTree:
+        return ViewTree.pane(MeasuredView(node.data, measures))
 
 
 @context(P=UiPane, L=UiLayout)
 class measure_layout(Case, alg=ViewTree):
+    '''layout subtrees are looked up in `cache` by their structure and size before they are measured.
+    '''
 
-    def __init__(self, bindings: Bindings, measures: Measures, width: float, height: float) -> None:
+    def __init__(self, bindings: Bindings, measures: Measures, width: float, height: float, cache: MeasureCache
+                 ) -> None:
         self.bindings = bindings
         self.measures = measures
         self.width = width
         self.height = height
+        self.cache = cache
 
-    def pane_node(self, node: PaneNode[A, P]) -> MeasureTree:
+    def pane_node(self, node: PaneNode[A, P], key: KeyTree) -> MeasureTree:
         return ViewTree.pane(MeasuredView(node.data, self.measures))
 
-    def layout_node(self, node: LayoutNode[A, P]) -> MeasureTree:
+    def layout_node(self, node: LayoutNode[A, P], key: KeyTree) -> MeasureTree:
         vertical = node.data.vertical
         total = self.height if vertical else self.width
-        views = open_views(self.bindings)(node)
-        def recurse(next_node: ViewTree[A, P], size: float) -> MeasureTree:
+        views = open_subtrees(node, key)
+        def recurse(next_node: ViewTree[A, P], next_key: KeyTree, size: float) -> MeasureTree:
             new_width, new_height = (self.width, size) if vertical else (size, self.height)
             next_measures = Measures(size)
-            return measure_layout(self.bindings)(next_measures, new_width, new_height)(next_node)
+            return measure_layout(self.bindings)(next_measures, new_width, new_height, self.cache)(next_node, next_key)
         def measure_views() -> List[MeasureTree]:
-            sizes = measure_layout_views(views / _.data / measure_data(V=self.bindings.bindings['P']), total)
-            return views.zip(sizes).map2(recurse)
-        sub = (
-            measure_views()
-            if views.length > 0 else
-            Nil
-        )
-        return ViewTree.layout(MeasuredView(node.data, self.measures), sub)
-
-    def sub_ui_node(self, node: SubUiNode[L, P]) -> Either[str, P]:
+            sizes = measure_layout_views(views / (lambda a: a[0].data) / measure_data(V=self.bindings.bindings['P']),
+                                         total)
+            return views.zip(sizes).map(lambda a: recurse(a[0][0], a[0][1], a[1]))
+        def measure() -> MeasureTree:
+            sub = (
+                measure_views()
+                if views.length > 0 else
+                Nil
+            )
+            return self.cache.store(cache_key, ViewTree.layout(MeasuredView(node.data, self.measures), sub))
+        cache_key = key.data.structure, self.width, self.height
+        return self.cache.lookup(cache_key).map(lambda a: graft_views()(a, node, key, self.measures)).get_or(measure)
+
+    def sub_ui_node(self, node: SubUiNode[L, P], key: KeyTree) -> Either[str, P]:
         return ViewTree.pane(MeasuredView(node.data, self.measures))
 
 
 @context(P=UiPane, L=UiLayout)
-def measure_view_tree(bindings: Bindings, layout: LayoutNode[L, P], width: float, height: float) -> MeasureTree:
+def measure_view_tree(bindings: Bindings, layout: LayoutNode[L, P], width: float, height: float,
+                      cache: MeasureCache=None) -> MeasureTree:
     size = height if layout.data.vertical else width
-    return measure_layout(bindings)(Measures(size), width, height)(layout)
+    key = measure_keys(bindings)()(layout)
+    return measure_layout(bindings)(Measures(size), width, height, measure_cache if cache is None else cache)(layout, key)
 
 
 def positive(a: float) -> float:
@@ -195,12 +309,57 @@ def balance_sizes(
         total: float,
 ) -> List[int]:
     data = Balance(min_s, max_s, weights, minimized, total)
+    cut = sum(min_s) > total
     fitted = (
         cut_sizes(data)
-        if sum(min_s) > total else
+        if cut else
         distribute_sizes(data)
     )
-    return rectify_sizes(fitted) / int
+    lower = min_s.map(lambda a: 2 if cut else max(2, math.ceil(a)))
+    upper = max_s.map(lambda a: a.map(math.floor))
+    return largest_remainder(rectify_sizes(fitted), lower, upper, int(total))
+
+
+def adjust_cells(
+        cells: list,
+        order: List[int],
+        allowed: Callable[[int], bool],
+        step: int,
+        missing: int,
+) -> int:
+    '''add `step` to the cells in `order` that are `allowed` to change, repeating until `missing` is zero or no cell
+    can be changed anymore.
+    '''
+    progress = True
+    while missing != 0 and progress:
+        progress = False
+        for i in order:
+            if missing == 0:
+                break
+            if allowed(i):
+                cells[i] += step
+                missing -= step
+                progress = True
+    return missing
+
+
+def largest_remainder(sizes: List[float], lower: List[int], upper: List[Maybe[int]], total: int) -> List[int]:
+    '''round sizes to cells that add up to `total` exactly.
+    Missing cells are given to the views with the largest fractional parts, surplus cells are taken from the largest
+    views. Both steps respect the bounds of the views as long as possible and ignore them only if the total can't be
+    reached otherwise, except for the minimum of one cell.
+    '''
+    cells = [math.floor(a) for a in sizes]
+    missing = total - sum(cells)
+    if missing > 0:
+        order = Lists.wrap(sorted(range(len(cells)), key=lambda i: cells[i] - sizes[i]))
+        missing = adjust_cells(cells, order, lambda i: upper[i].map(lambda a: cells[i] < a) | True, 1, missing)
+        adjust_cells(cells, order, lambda i: True, 1, missing)
+    elif missing < 0:
+        order = Lists.wrap(sorted(range(len(cells)), key=lambda i: -cells[i]))
+        missing = adjust_cells(cells, order, lambda i: cells[i] > lower[i], -1, missing)
+        adjust_cells(cells, order, lambda i: cells[i] > 1, -1, missing)
+    return Lists.wrap(cells)
 
 
 def rectify_sizes(sizes: List[float]) -> List[float]:
@@ -230,18 +389,30 @@ def distribute_on_unbounded(data: Balance) -> List[float]:
     return initial.zip(new_weights).map2(lambda i, w: i + w * surplus)
 
 
-def saturate(initial: List[float], max_s: List[float], initial_weights: List[float], total: float) -> List[float]:
-    def loop(current: List[float], weights: List[float]) -> List[float]:
-        rest = total - sum(current)
-        unsat_weights = current.zip(max_s, weights).map3(lambda s, m, w: 0 if s >= m else w)
-        new_weights = normalize_weights(unsat_weights)
-        new = current.zip(max_s, new_weights).map3(lambda l, h, w: min(l + w * rest, h))
-        return (
-            new
-            if new == current or rest <= 0
-            else loop(new, new_weights)
-        )
-    return loop(initial, initial_weights)
+def saturate(initial: List[float], max_s: List[float], weights: List[float], total: float) -> List[float]:
+    '''distribute the space left over by `initial` proportionally to the weights, filling up views until they reach
+    their maximum and handing their share to the others.
+    Each view has size `min(initial + weight * level, max)` for a common level.
+    Sorting the views by the level at which they reach their maximum allows finding the level at which the sizes add
+    up to `total` in a single pass.
+    '''
+    base = initial.zip(max_s).map2(min)
+    thresholds = sorted(
+        ((h - b) / w, b, h, w)
+        for b, h, w in zip(base, max_s, weights)
+        if w > 0
+    )
+    filled = sum(base)
+    free_weights = list(accumulate(w for t, b, h, w in reversed(thresholds)))[::-1]
+    for (threshold, b, h, w), free_weight in zip(thresholds, free_weights):
+        level = (total - filled) / free_weight
+        if level <= threshold:
+            break
+        filled += h - b
+    else:
+        level = max(thresholds[-1][0], 0) if thresholds else 0
+    level = max(level, 0)
+    return base.zip(max_s, weights).map3(lambda b, h, w: min(b + w * level, h))
 
 
 def weights_without_minimized(data: Balance) -> List[float]:
@@ -255,8 +426,6 @@ def trim_weights(data: Balance, unsat: List[Boolean]):
 
 def distribute_on_all(data: Balance) -> List[float]:
     max_s = data.max / (_ | 10e6)
-    min_surplus = data.total - sum(data.min)
-    sizes = data.min.zip(max_s, data.weights).map3(lambda l, h, w: min(l + w * min_surplus, h))
     sizes = saturate(data.min, max_s, data.weights, data.total)
     rest = data.total - sum(sizes)
     def dist_rest() -> List[float]:
@@ -285,4 +454,4 @@ def amend_weights(weights: List[Maybe[float]]) -> List[float]:
     return weights / (_ | empty_weight)
 
 
-__all__ = ('measure_layout', 'measure_view_tree')
+__all__ = ('measure_layout', 'measure_view_tree', 'MeasureKey', 'measure_keys', 'MeasureCache', 'measure_cache')
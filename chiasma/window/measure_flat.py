@@ -0,0 +1,76 @@
+'''measurement of view trees in the flat encoding, iterating over the node arrays instead of recursing, so that the
+depth of a tree isn't limited by the recursion limit.
+'''
+from typing import TypeVar
+
+from amino import List, Lists, Maybe
+from amino.tc.context import context, Bindings
+
+from chiasma.data.flat_tree import FlatViewTree, layout_kind, pane_kind
+from chiasma.data.view_tree import LayoutNode, PaneNode
+from chiasma.ui.view import UiPane, UiLayout
+from chiasma.window.measure import measure_data, measure_layout_views, MeasureTree, MeasuredView, Measures
+
+L = TypeVar('L')
+P = TypeVar('P')
+
+
+def flat_open_views(flat: FlatViewTree[L, P]) -> List[bool]:
+    '''whether each node is a pane that is open or a layout that contains one.
+    '''
+    opened = [False] * flat.size
+    for index in range(flat.size - 1, -1, -1):
+        kind = flat.kinds[index]
+        opened[index] = (
+            bool(flat.data[index].open)
+            if kind == pane_kind else
+            any(opened[a] for a in flat.children(index))
+            if kind == layout_kind else
+            True
+        )
+    return Lists.wrap(opened)
+
+
+@context(P=UiPane, L=UiLayout)
+def measure_flat_tree(bindings: Bindings, flat: FlatViewTree[L, P], width: float, height: float
+                      ) -> List[Maybe[float]]:
+    '''the size of each node along the axis of its parent, like `measure_view_tree`.
+    Nodes that are not measured because they or one of their ancestors are closed have no size.
+    '''
+    view_data = measure_data(V=bindings.bindings['P'])
+    opened = flat_open_views(flat)
+    sizes = [None] * flat.size
+    widths = [width] * flat.size
+    heights = [height] * flat.size
+    sizes[0] = height if flat.data[0].vertical else width
+    for index in range(flat.size):
+        if flat.kinds[index] != layout_kind or sizes[index] is None:
+            continue
+        vertical = flat.data[index].vertical
+        views = [a for a in flat.children(index) if opened[a]]
+        if views:
+            total = heights[index] if vertical else widths[index]
+            view_sizes = measure_layout_views(Lists.wrap(view_data(flat.data[a]) for a in views), total)
+            for view, size in zip(views, view_sizes):
+                sizes[view] = size
+                widths[view], heights[view] = (widths[index], size) if vertical else (size, heights[index])
+    return Lists.wrap(sizes).map(Maybe.optional)
+
+
+def flat_measure_tree(flat: FlatViewTree[L, P], sizes: List[Maybe[float]]) -> MeasureTree:
+    '''the measure tree of the nodes that have a size, as produced by `measure_view_tree`.
+    '''
+    nodes = [None] * flat.size
+    for index in range(flat.size - 1, -1, -1):
+        size = sizes[index]
+        if size.present:
+            view = MeasuredView(flat.data[index], Measures(size | None))
+            nodes[index] = (
+                LayoutNode(view, Lists.wrap(nodes[a] for a in flat.children(index) if nodes[a] is not None))
+                if flat.kinds[index] == layout_kind else
+                PaneNode(view)
+            )
+    return nodes[0]
+
+
+__all__ = ('flat_open_views', 'measure_flat_tree', 'flat_measure_tree')
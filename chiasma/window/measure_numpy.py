@@ -0,0 +1,160 @@
+'''vectorized variant of `balance_sizes` for layouts with many views.
+The operations mirror those of the pure implementation in `chiasma.window.measure` one to one, including the order
+in which floats are added up, so that both produce identical cells.
+This module requires numpy, which is an optional dependency.
+'''
+import math
+
+import numpy as np
+
+from amino import List, Maybe, Lists
+
+unbounded_max = 10e6
+
+
+def ordered_sum(a: np.ndarray) -> float:
+    '''sum from left to right like the builtin `sum`, since `np.sum` uses pairwise summation.
+    '''
+    return float(np.cumsum(a)[-1]) if a.size else 0
+
+
+def divide(a: float, b: float) -> float:
+    if b == 0:
+        raise ZeroDivisionError('division by zero')
+    return a / b
+
+
+def normalize_weights(weights: np.ndarray) -> np.ndarray:
+    total = ordered_sum(weights) or 1
+    return weights / total
+
+
+def amend_and_normalize_weights(weights: np.ndarray, present: np.ndarray) -> np.ndarray:
+    total = ordered_sum(weights[present]) or 1
+    empties = int(np.count_nonzero(~present)) or 1
+    return normalize_weights(np.where(present, weights, total / empties))
+
+
+def reverse_weights(weights: np.ndarray) -> np.ndarray:
+    r = 1 - weights
+    norm = ordered_sum(r)
+    return r / norm if norm > 0 else r
+
+
+def cut_sizes(min_s: np.ndarray, weights: np.ndarray, total: float) -> np.ndarray:
+    surplus = ordered_sum(min_s) - total
+    cut = min_s - surplus * reverse_weights(weights)
+    negative = cut < 0
+    neg_total = ordered_sum(np.where(negative, cut, 0))
+    dist2 = divide(neg_total, min_s.size - int(np.count_nonzero(negative)))
+    return np.where(negative, 0, cut + dist2)
+
+
+def distribute_on_unbounded(min_s: np.ndarray, max_s: np.ndarray, bounded: np.ndarray, weights: np.ndarray,
+                            total: float) -> np.ndarray:
+    initial = np.where(bounded, max_s, min_s)
+    new_weights = normalize_weights(np.where(bounded, 0, weights))
+    surplus = total - ordered_sum(initial)
+    return initial + new_weights * surplus
+
+
+def saturate(initial: np.ndarray, max_s: np.ndarray, weights: np.ndarray, total: float) -> np.ndarray:
+    '''the levels at which the sorted views reach their maximum are compared with the levels that would fill `total`
+    if all views from that one on were still growing, and the first level that fits is used.
+    '''
+    base = np.minimum(initial, max_s)
+    growing = weights > 0
+    b, h, w = base[growing], max_s[growing], weights[growing]
+    thresholds = (h - b) / w
+    order = np.lexsort((w, h, b, thresholds))
+    thresholds, b, h, w = thresholds[order], b[order], h[order], w[order]
+    if thresholds.size:
+        filled = np.cumsum(np.concatenate(([ordered_sum(base)], h - b)))[:-1]
+        free_weights = np.cumsum(w[::-1])[::-1]
+        levels = (total - filled) / free_weights
+        fitting = np.flatnonzero(levels <= thresholds)
+        level = levels[fitting[0]] if fitting.size else max(thresholds[-1], 0)
+    else:
+        level = 0
+    level = max(level, 0)
+    return np.minimum(base + weights * level, max_s)
+
+
+def weights_without_minimized(weights: np.ndarray, minimized: np.ndarray) -> np.ndarray:
+    return normalize_weights(np.where(minimized, 0, weights))
+
+
+def distribute_on_all(min_s: np.ndarray, max_s: np.ndarray, bounded: np.ndarray, weights: np.ndarray,
+                      minimized: np.ndarray, total: float) -> np.ndarray:
+    max_s = np.where(bounded, max_s, unbounded_max)
+    sizes = saturate(min_s, max_s, weights, total)
+    rest = total - ordered_sum(sizes)
+    if rest <= 0:
+        return sizes
+    unsat = max_s > sizes
+    unweighted = weights_without_minimized(weights, minimized)
+    rest_w = amend_and_normalize_weights(unweighted, unsat) if unsat.any() else unweighted
+    return sizes + rest_w * rest
+
+
+def rectify_sizes(sizes: np.ndarray) -> np.ndarray:
+    pos = np.maximum(sizes, 0)
+    small = pos < 2
+    sub = divide(ordered_sum(np.where(small, 2 - pos, 0)), int(np.count_nonzero(sizes >= 2)))
+    return np.where(small, 2, np.maximum(2, pos - sub))
+
+
+def adjust_cells(cells: np.ndarray, order: np.ndarray, allowed: np.ndarray, step: int, missing: int) -> int:
+    '''each pass of the pure implementation changes the first `missing` cells in `order` that are allowed to change.
+    '''
+    while missing != 0:
+        candidates = order[allowed(cells)[order]][:abs(missing)]
+        if candidates.size == 0:
+            break
+        cells[candidates] += step
+        missing -= step * candidates.size
+    return missing
+
+
+def largest_remainder(sizes: np.ndarray, lower: np.ndarray, upper: np.ndarray, total: int) -> np.ndarray:
+    cells = np.floor(sizes).astype(np.int64)
+    missing = total - int(cells.sum())
+    if missing > 0:
+        order = np.argsort(cells - sizes, kind='stable')
+        missing = adjust_cells(cells, order, lambda c: c < upper, 1, missing)
+        adjust_cells(cells, order, lambda c: np.ones(c.size, dtype=bool), 1, missing)
+    elif missing < 0:
+        order = np.argsort(-cells, kind='stable')
+        missing = adjust_cells(cells, order, lambda c: c > lower, -1, missing)
+        adjust_cells(cells, order, lambda c: c > 1, -1, missing)
+    return cells
+
+
+def balance_sizes_numpy(
+        min_s: List[float],
+        max_s: List[Maybe[float]],
+        weights: List[float],
+        minimized: List[bool],
+        total: float,
+) -> List[int]:
+    '''equivalent to `chiasma.window.measure.balance_sizes`.
+    '''
+    mins = np.array(min_s, dtype=float)
+    bounded = np.array([a.present for a in max_s], dtype=bool)
+    maxs = np.array([a | math.inf for a in max_s], dtype=float)
+    weights_a = np.array(weights, dtype=float)
+    cut = ordered_sum(mins) > total
+    fitted = (
+        cut_sizes(mins, weights_a, total)
+        if cut else
+        distribute_on_unbounded(mins, maxs, bounded, weights_a, total)
+        if ordered_sum(maxs[bounded]) < total and not bounded.all() else
+        distribute_on_all(mins, maxs, bounded, weights_a, np.array(minimized, dtype=bool), total)
+    )
+    lower = np.full(mins.size, 2) if cut else np.maximum(2, np.ceil(mins))
+    upper = np.floor(maxs)
+    cells = largest_remainder(rectify_sizes(fitted), lower, upper, int(total))
+    return Lists.wrap(cells.tolist())
+
+
+__all__ = ('balance_sizes_numpy',)
@@ -0,0 +1,159 @@
+from itertools import accumulate
+from typing import Tuple
+
+from amino import Either, List, Map, Lists, Nil, Left, Right, do, Do, _
+from amino.case import Case
+
+from chiasma.data.view_tree import ViewTree, SubUiNode, LayoutNode, PaneNode
+from chiasma.window.measure import MeasuredLayoutNode, MeasuredPaneNode
+from chiasma.util.id import Ident
+from chiasma.io.compute import TmuxIO
+from chiasma.commands.pane import window_panes, swap_pane
+from chiasma.commands.window import select_layout
+from chiasma.commands.layout import layout_checksum, CellGeometry, LayoutCell, PaneCell, LayoutTree
+
+
+def fit_sizes(sizes: List[int], total: int) -> Either[str, List[int]]:
+    '''adjust the last size for rounding errors so that the cells fill the layout exactly, with one cell between each
+    two views for the separator.
+    '''
+    rest = total - sum(sizes) - (sizes.length - 1)
+    last = sizes.last.map(_ + rest) | 0
+    return (
+        Left(f'cannot fit {sizes} into {total} cells')
+        if last < 1 else
+        Right(sizes[:-1].cat(last))
+    )
+
+
+def geometry_description(geometry: CellGeometry) -> str:
+    return f'{geometry.width}x{geometry.height},{geometry.x},{geometry.y}'
+
+
+def cell_offsets(start: int, sizes: List[int]) -> List[int]:
+    return Lists.wrap(accumulate([start] + [size + 1 for size in sizes[:-1]]))
+
+
+class measured_cells(Case[ViewTree, Either[str, LayoutTree]], alg=ViewTree):
+    '''the cells that tmux creates for a measured view tree when applying its layout string.
+    Layouts with a single open view are collapsed into their view, since tmux doesn't create such cells.
+    '''
+
+    def __init__(self, pane_ids: Map[Ident, int]) -> None:
+        self.pane_ids = pane_ids
+
+    def pane_node(self, node: MeasuredPaneNode, geometry: CellGeometry) -> Either[str, LayoutTree]:
+        ident = node.data.view.ident
+        return (
+            self.pane_ids.lift(ident)
+            .to_either(f'no tmux id for pane `{ident}`')
+            .map(lambda id: ViewTree.pane(PaneCell(geometry, id)))
+        )
+
+    @do(Either[str, LayoutTree])
+    def layout_node(self, node: MeasuredLayoutNode, geometry: CellGeometry) -> Do:
+        vertical = node.data.view.vertical
+        total = geometry.height if vertical else geometry.width
+        sizes = yield fit_sizes(node.sub.map(lambda a: int(a.data.measures.size)), total)
+        offsets = cell_offsets(geometry.y if vertical else geometry.x, sizes)
+        def sub_geometry(size: int, offset: int) -> CellGeometry:
+            return (
+                CellGeometry(geometry.width, size, geometry.x, offset)
+                if vertical else
+                CellGeometry(size, geometry.height, offset, geometry.y)
+            )
+        cells = yield node.sub.zip(sizes, offsets).traverse(lambda a: self(a[0], sub_geometry(a[1], a[2])), Either)
+        yield (
+            Right(cells.head | None)
+            if cells.length == 1 else
+            Right(ViewTree.layout(LayoutCell(geometry, vertical), cells))
+        )
+
+    def sub_ui_node(self, node: SubUiNode, geometry: CellGeometry) -> Either[str, LayoutTree]:
+        return Left('SubUiNode')
+
+
+class cell_description(Case[LayoutTree, str], alg=ViewTree):
+    '''the tmux layout string for a tree of cells, without the checksum.
+    '''
+
+    def pane_node(self, node: PaneNode[LayoutCell, PaneCell]) -> str:
+        return f'{geometry_description(node.data.geometry)},{node.data.id}'
+
+    def layout_node(self, node: LayoutNode[LayoutCell, PaneCell]) -> str:
+        open, close = ('[', ']') if node.data.vertical else ('{', '}')
+        cells = node.sub.map(self)
+        return f'{geometry_description(node.data.geometry)}{open}{",".join(cells)}{close}'
+
+    def sub_ui_node(self, node: SubUiNode) -> str:
+        return ''
+
+
+class layout_pane_idents(Case[ViewTree, List[Ident]], alg=ViewTree):
+    '''the panes of a measured view tree in the order of the cells of its layout string.
+    '''
+
+    def pane_node(self, node: MeasuredPaneNode) -> List[Ident]:
+        return List(node.data.view.ident)
+
+    def layout_node(self, node: MeasuredLayoutNode) -> List[Ident]:
+        return node.sub.flat_map(self)
+
+    def sub_ui_node(self, node: SubUiNode) -> List[Ident]:
+        return Nil
+
+
+def tree_cells(tree: ViewTree, width: int, height: int, pane_ids: Map[Ident, int]) -> Either[str, LayoutTree]:
+    return measured_cells(pane_ids)(tree, CellGeometry(width, height, 0, 0))
+
+
+@do(Either[str, str])
+def tmux_layout(tree: ViewTree, width: int, height: int, pane_ids: Map[Ident, int]) -> Do:
+    cells = yield tree_cells(tree, width, height, pane_ids)
+    description = cell_description()(cells)
+    return f'{layout_checksum(description)},{description}'
+
+
+def layout_pane_ids(tree: ViewTree, pane_ids: Map[Ident, int]) -> Either[str, List[int]]:
+    return layout_pane_idents()(tree).traverse(lambda a: pane_ids.lift(a).to_either(f'no tmux id for `{a}`'), Either)
+
+
+def pane_swaps(current: List[int], wanted: List[int]) -> Either[str, List[Tuple[int, int]]]:
+    '''tmux assigns the window's panes to the cells of a layout string in the order of the window's pane list,
+    ignoring the pane ids in the layout, so the panes have to be swapped into the order of the cells first.
+    '''
+    def swaps() -> List[Tuple[int, int]]:
+        order = list(current)
+        result = []
+        for i, pane in enumerate(wanted):
+            if order[i] != pane:
+                j = order.index(pane)
+                result.append((pane, order[i]))
+                order[i], order[j] = order[j], order[i]
+        return Lists.wrap(result)
+    return (
+        Right(swaps())
+        if sorted(current) == sorted(wanted) else
+        Left(f'window panes {current} don\'t match layout panes {wanted}')
+    )
+
+
+@do(TmuxIO[None])
+def apply_layout(wid: int, layout: str, panes: List[int]) -> Do:
+    '''arrange the panes of a window with a single `select-layout`, after swapping them into the order of the cells.
+    '''
+    current = yield window_panes(wid)
+    swaps = yield TmuxIO.from_either(pane_swaps(current.map(_.id), panes))
+    yield swaps.traverse(lambda a: swap_pane(*a), TmuxIO)
+    yield select_layout(wid, layout)
+
+
+@do(TmuxIO[None])
+def apply_tree_layout(wid: int, tree: ViewTree, width: int, height: int, pane_ids: Map[Ident, int]) -> Do:
+    layout = yield TmuxIO.from_either(tmux_layout(tree, width, height, pane_ids))
+    panes = yield TmuxIO.from_either(layout_pane_ids(tree, pane_ids))
+    yield apply_layout(wid, layout, panes)
+
+
+__all__ = ('measured_cells', 'cell_description', 'tree_cells', 'tmux_layout', 'layout_pane_ids', 'pane_swaps',
+           'apply_layout', 'apply_tree_layout')
@@ -0,0 +1,69 @@
+from amino import Dat, List, Maybe, Map, Nil, do, Do
+from amino.logging import module_log
+
+from chiasma.io.compute import TmuxIO
+from chiasma.commands.layout import CellGeometry, LayoutTree, layout_pane_cells, window_layout
+from chiasma.commands.pane import resize_pane
+from chiasma.window.tmux_layout import tree_cells
+from chiasma.data.view_tree import ViewTree
+from chiasma.util.id import Ident
+
+log = module_log()
+
+
+class PaneDeviation(Dat['PaneDeviation']):
+    '''a pane whose geometry in tmux differs from the one computed for its view.
+    `actual` is empty if the pane is missing from the window.
+    '''
+
+    def __init__(self, id: int, expected: CellGeometry, actual: Maybe[CellGeometry]) -> None:
+        self.id = id
+        self.expected = expected
+        self.actual = actual
+
+
+def pane_deviations(expected: LayoutTree, actual: LayoutTree) -> List[PaneDeviation]:
+    actual_cells = Map(layout_pane_cells()(actual).map(lambda a: (a.id, a.geometry)))
+    return (
+        layout_pane_cells()(expected)
+        .map(lambda a: PaneDeviation(a.id, a.geometry, actual_cells.lift(a.id)))
+        .filter(lambda a: not a.actual.contains(a.expected))
+    )
+
+
+def correct_deviation(deviation: PaneDeviation) -> TmuxIO[None]:
+    '''resize a pane to its expected dimensions.
+    Deviations in the position are caused by the sizes of other panes and are not corrected directly.
+    '''
+    def resize(actual: CellGeometry) -> List[TmuxIO[None]]:
+        expected = deviation.expected
+        return (
+            List(resize_pane(deviation.id, False, expected.width)).filter(lambda a: actual.width != expected.width) +
+            List(resize_pane(deviation.id, True, expected.height)).filter(lambda a: actual.height != expected.height)
+        )
+    return (deviation.actual.map(resize) | Nil).traverse(lambda a: a, TmuxIO)
+
+
+@do(TmuxIO[List[PaneDeviation]])
+def verify_layout(wid: int, expected: LayoutTree) -> Do:
+    '''compare the pane geometry of a window to the expected cells, read with a single query, and resize the panes
+    that deviate.
+    '''
+    actual_e = yield window_layout(wid)
+    actual = yield TmuxIO.from_either(actual_e)
+    deviations = pane_deviations(expected, actual)
+    if deviations:
+        log.debug(f'correcting layout deviations in window {wid}: {deviations}')
+    yield deviations.traverse(correct_deviation, TmuxIO)
+    return deviations
+
+
+def verify_window(wid: int, tree: ViewTree, width: int, height: int, pane_ids: Map[Ident, int]
+                  ) -> TmuxIO[List[PaneDeviation]]:
+    def skip(error: str) -> TmuxIO[List[PaneDeviation]]:
+        log.debug(f'cannot verify layout of window {wid}: {error}')
+        return TmuxIO.pure(Nil)
+    return tree_cells(tree, width, height, pane_ids).map(lambda a: verify_layout(wid, a)).value_or(skip)
+
+
+__all__ = ('PaneDeviation', 'pane_deviations', 'correct_deviation', 'verify_layout', 'verify_window')
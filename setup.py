@@ -11,12 +11,16 @@ setup(
     author_email='torstenschmits@gmail.com',
     license='MIT',
     url='https://github.com/tek/chiasma',
-    packages=find_packages(exclude=['unit', 'unit.*', 'integration', 'integration.*']),
+    packages=find_packages(exclude=['unit', 'unit.*', 'integration', 'integration.*', 'bench', 'bench.*']),
     install_requires=[
         'amino~=13.0.1a5',
         'psutil==5.3.1',
     ],
+    extras_require={
+        'numpy': ['numpy'],
+    },
     tests_require=[
         'kallikrein~=0.22.0a15',
+        'numpy',
     ],
 )
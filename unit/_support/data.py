@@ -35,9 +35,12 @@ def ui_open_simple_pane(spec: IdentSpec) -> Do:
 
 
 @do(TS[SpecData, None])
-def simple_render() -> Do:
+def simple_render(verify: bool=False) -> Do:
     layout = yield TS.inspect(_.layout)
-    yield render(P=SimplePane, L=SimpleLayout)(StrIdent('main'), StrIdent('main'), layout).transform_s_lens(lens.views)
+    yield (
+        render(P=SimplePane, L=SimpleLayout)(StrIdent('main'), StrIdent('main'), layout, verify)
+        .transform_s_lens(lens.views)
+    )
 
 
 @do(TS[SpecData, None])
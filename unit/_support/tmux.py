@@ -0,0 +1,43 @@
+from amino import List, Nil
+
+from chiasma.tmux import Tmux, TmuxCmd, TmuxCmdResult, TmuxCmdSuccess, TmuxCmdError, PSuccess, PError
+
+
+class RecordTmux(Tmux):
+    '''records the names of the commands of each batch, echoing them as their output.
+    Commands named `fail` produce an error.
+    '''
+
+    def __init__(self) -> None:
+        self.batches = Nil
+
+    def execute_cmds(self, cmds: List[TmuxCmd]) -> List[TmuxCmdResult]:
+        self.batches = self.batches.cat(cmds.map(lambda a: a.cmd))
+        return cmds.map(
+            lambda a:
+            TmuxCmdError(a, PError(List('failed')))
+            if a.cmd == 'fail' else
+            TmuxCmdSuccess(a, PSuccess(List(a.cmd)))
+        )
+
+
+class LogTmux(Tmux):
+    '''executes commands with another instance, recording their names, both in total and per batch.
+    '''
+
+    def __init__(self, tmux: Tmux) -> None:
+        self.tmux = tmux
+        self.cmds = Nil
+        self.batches = Nil
+
+    def execute_cmds(self, cmds: List[TmuxCmd]) -> List[TmuxCmdResult]:
+        names = cmds.map(lambda a: a.cmd)
+        self.cmds = self.cmds + names
+        self.batches = self.batches.cat(names)
+        return self.tmux.execute_cmds(cmds)
+
+    def count(self, name: str) -> int:
+        return self.cmds.filter(lambda a: a == name).length
+
+
+__all__ = ('RecordTmux', 'LogTmux',)
@@ -0,0 +1,88 @@
+import asyncio
+
+from kallikrein import k, Expectation
+from kallikrein.matchers.length import have_length
+
+from amino import do, Do, List
+
+from chiasma.test.tmux_spec import TmuxSpec, tmux_spec_socket
+from chiasma.test.terminal import start_tmux
+from chiasma.tmux import AsyncTmux
+from chiasma.io.compute import TmuxIO
+from chiasma.io.data import TResult
+from chiasma.commands.pane import all_panes, PaneData
+from chiasma.commands.server import kill_server
+
+
+@do(TmuxIO[List[PaneData]])
+def split() -> Do:
+    yield TmuxIO.write('split-window')
+    yield all_panes()
+
+
+class AsyncSpec(TmuxSpec):
+    '''
+    run concurrent programs on one event loop $concurrent
+    reconnect after the server was restarted $reconnect
+    sleep without blocking the loop $sleep
+    fail pending batches if the reader fails $reader_failure
+    '''
+
+    def concurrent(self) -> Expectation:
+        tmux = AsyncTmux.cons(tmux_spec_socket)
+        async def run() -> List[TResult[List[PaneData]]]:
+            try:
+                first = await split().run_async(tmux)
+                rest = await asyncio.gather(*[all_panes().run_async(tmux) for i in range(3)])
+                return List(first, *rest)
+            finally:
+                await tmux.close_async()
+        results = asyncio.run(run())
+        counts = results / (lambda a: a.to_either.map(len) | 0)
+        return k(counts) == List(2, 2, 2, 2)
+
+    def reconnect(self) -> Expectation:
+        tmux = AsyncTmux.cons(tmux_spec_socket)
+        async def run() -> TResult[List[PaneData]]:
+            try:
+                await all_panes().run_async(tmux)
+                await kill_server().run_async(tmux)
+                self.tmux_proc.kill()
+                self.tmux_proc.wait()
+                self._wait(.2)
+                self.tmux_proc = start_tmux(tmux_spec_socket, self.win_width, self.win_height,
+                                            self.tmux_in_terminal())
+                self._wait(.2)
+                return await all_panes().run_async(tmux)
+            finally:
+                await tmux.close_async()
+        return k(asyncio.run(run()).to_either.get_or_raise()).must(have_length(1))
+
+    def sleep(self) -> Expectation:
+        tmux = AsyncTmux.cons(tmux_spec_socket)
+        async def run() -> bool:
+            sleeper = asyncio.ensure_future(TmuxIO.sleep(.5).run_async(tmux))
+            await asyncio.sleep(.1)
+            done = sleeper.done()
+            await sleeper
+            return done
+        return k(asyncio.run(run())).false
+
+    def reader_failure(self) -> Expectation:
+        tmux = AsyncTmux.cons(tmux_spec_socket)
+        def fail(blocks: List) -> None:
+            raise Exception('reader failed')
+        async def run() -> str:
+            try:
+                await all_panes().run_async(tmux)
+                tmux.correlation.feed = fail
+                await asyncio.wait_for(all_panes().run_async(tmux), 5)
+                return 'no error'
+            except Exception as e:
+                return str(e)
+            finally:
+                await tmux.close_async()
+        return k(asyncio.run(run())) == 'reader failed'
+
+
+__all__ = ('AsyncSpec',)
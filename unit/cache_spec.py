@@ -0,0 +1,66 @@
+from kallikrein import k, Expectation
+
+from amino.test.spec import SpecBase
+from amino import List, do, Do
+
+from chiasma.io.compute import TmuxIO, ReadCache
+
+from unit._support.tmux import RecordTmux
+
+
+@do(TmuxIO[None])
+def repeat() -> Do:
+    yield TmuxIO.read('list-panes')
+    yield TmuxIO.read('list-panes')
+    yield TmuxIO.read('list-windows')
+    yield TmuxIO.read('list-panes')
+
+
+@do(TmuxIO[None])
+def write_between() -> Do:
+    yield TmuxIO.read('list-panes')
+    yield TmuxIO.write('split-window')
+    yield TmuxIO.read('list-panes')
+
+
+@do(TmuxIO[None])
+def sleep_between() -> Do:
+    yield TmuxIO.read('list-panes')
+    yield TmuxIO.sleep(0)
+    yield TmuxIO.read('list-panes')
+
+
+class CacheSpec(SpecBase):
+    '''
+    serve repeated queries from the cache $repeat
+    invalidate the cache when writing $write
+    invalidate the cache when sleeping $sleep
+    send identical queries of parallel branches once $par
+    '''
+
+    def repeat(self) -> Expectation:
+        tmux = RecordTmux()
+        cache = ReadCache()
+        repeat().run(tmux, cache)
+        return (k(tmux.batches) == List(List('list-panes'), List('list-windows'))) & (k(cache.hits) == 2)
+
+    def write(self) -> Expectation:
+        tmux = RecordTmux()
+        write_between().run(tmux)
+        return k(tmux.batches) == List(List('list-panes'), List('split-window', 'list-panes'))
+
+    def sleep(self) -> Expectation:
+        tmux = RecordTmux()
+        sleep_between().run(tmux)
+        return k(tmux.batches) == List(List('list-panes'), List('list-panes'))
+
+    def par(self) -> Expectation:
+        tmux = RecordTmux()
+        result = TmuxIO.traverse_par(List('list-panes', 'list-panes', 'list-windows'), TmuxIO.read).unsafe(tmux)
+        return (
+            (k(tmux.batches) == List(List('list-panes', 'list-windows'))) &
+            (k(result) == List(List('list-panes'), List('list-panes'), List('list-windows')))
+        )
+
+
+__all__ = ('CacheSpec',)
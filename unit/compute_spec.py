@@ -0,0 +1,49 @@
+from kallikrein import k, Expectation
+
+from amino.test.spec import SpecBase
+from amino import Nil, List
+
+from chiasma.io.compute import TmuxIO
+from chiasma.io.data import TSuccess, TError
+from chiasma.tmux import PureTmux, Tmux
+
+from unit._support.tmux import RecordTmux
+
+count = 100000
+
+
+def boom(tmux: Tmux) -> TmuxIO[None]:
+    raise Exception('boom')
+
+
+class ComputeSpec(SpecBase):
+    '''
+    evaluate a long left-associated chain of binds $left
+    evaluate a long right-associated chain of binds $right
+    report the location of a failed thunk $error_callsite
+    don't recover from failed writes preceding an attempt $attempt_writes
+    '''
+
+    def left(self) -> Expectation:
+        io = TmuxIO.pure(0)
+        for i in range(count):
+            io = io.flat_map(lambda a: TmuxIO.pure(a + 1))
+        return k(io.run(PureTmux(Nil, Nil, Nil))) == TSuccess(count)
+
+    def right(self) -> Expectation:
+        def step(a: int) -> TmuxIO[int]:
+            return TmuxIO.pure(a) if a >= count else TmuxIO.pure(a + 1).flat_map(step)
+        return k(TmuxIO.pure(0).flat_map(step).run(PureTmux(Nil, Nil, Nil))) == TSuccess(count)
+
+    def error_callsite(self) -> Expectation:
+        result = TmuxIO.pure(1).flat_map(lambda a: TmuxIO.suspend(boom)).either(PureTmux(Nil, Nil, Nil))
+        return k(result.value.callsite.f_code.co_name) == 'boom'
+
+    def attempt_writes(self) -> Expectation:
+        tmux = RecordTmux()
+        lookup = TmuxIO.read('x').map(lambda a: 'ok').recover_error(lambda err: 'fallback')
+        result = TmuxIO.write('fail').flat_map(lambda a: lookup).run(tmux)
+        return (k(isinstance(result, TError)).true) & (k(tmux.batches) == List(List('fail')))
+
+
+__all__ = ('ComputeSpec',)
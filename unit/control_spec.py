@@ -0,0 +1,53 @@
+from kallikrein import k, Expectation
+from kallikrein.matchers.length import have_length
+
+from amino import do, Do, List
+
+from chiasma.test.tmux_spec import TmuxSpec, tmux_spec_socket
+from chiasma.test.terminal import start_tmux
+from chiasma.tmux import Tmux
+from chiasma.io.compute import TmuxIO
+from chiasma.commands.pane import all_panes, PaneData
+from chiasma.commands.server import kill_server
+
+
+@do(TmuxIO[List[PaneData]])
+def split_twice() -> Do:
+    yield TmuxIO.write('split-window')
+    yield all_panes()
+    yield TmuxIO.write('split-window')
+    yield all_panes()
+
+
+class ControlSpec(TmuxSpec):
+    '''
+    run several batches through one control mode client $batches
+    reconnect after the server was restarted $reconnect
+    '''
+
+    def setup(self) -> None:
+        super().setup()
+        self.control = Tmux.cons(tmux_spec_socket, persistent=True)
+
+    def teardown(self) -> None:
+        self.control.close()
+        super().teardown()
+
+    def batches(self) -> Expectation:
+        panes = split_twice().unsafe(self.control)
+        pid = self.control.proc.pid
+        panes1 = all_panes().unsafe(self.control)
+        return k(panes).must(have_length(3)) & k(panes1).must(have_length(3)) & (k(self.control.proc.pid) == pid)
+
+    def reconnect(self) -> Expectation:
+        all_panes().unsafe(self.control)
+        kill_server().result(self.control)
+        self.tmux_proc.kill()
+        self.tmux_proc.wait()
+        self._wait(.2)
+        self.tmux_proc = start_tmux(tmux_spec_socket, self.win_width, self.win_height, self.tmux_in_terminal())
+        self._wait(.2)
+        return k(all_panes().unsafe(self.control)).must(have_length(1))
+
+
+__all__ = ('ControlSpec',)
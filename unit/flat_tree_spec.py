@@ -0,0 +1,72 @@
+from kallikrein import k, Expectation
+
+from amino.test.spec import SpecBase
+from amino import List, Just, Nothing
+
+from chiasma.data.view_tree import ViewTree
+from chiasma.data.flat_tree import flatten_view_tree, unflatten_view_tree, flat_pane_index, flat_path
+from chiasma.ui.simple import SimpleLayout, SimplePane
+from chiasma.util.id import StrIdent
+from chiasma.window.measure import measure_view_tree, MeasureCache
+from chiasma.window.measure_flat import measure_flat_tree, flat_measure_tree
+from chiasma.open_pane import ui_open_panes
+
+from unit._support.layout import three
+
+
+def nested() -> ViewTree:
+    return ViewTree.layout(
+        SimpleLayout.cons('root', vertical=True),
+        List(
+            three,
+            ViewTree.layout(SimpleLayout.cons('closed'), List(ViewTree.pane(SimplePane.cons('four')))),
+            ViewTree.pane(SimplePane.cons('five')),
+        ),
+    )
+
+
+def deep(depth: int) -> ViewTree:
+    tree = ViewTree.pane(SimplePane.cons('leaf', open=True))
+    for i in range(depth):
+        tree = ViewTree.layout(SimpleLayout.cons(f'layout{i}', vertical=i % 2 == 0), List(tree))
+    return tree
+
+
+class FlatTreeSpec(SpecBase):
+    '''
+    convert a tree to the flat encoding and back $convert
+    find a pane and its ancestors $find
+    measure like the recursive implementation $measure
+    measure a tree deeper than the recursion limit $deep
+    '''
+
+    def convert(self) -> Expectation:
+        flat = flatten_view_tree(nested())
+        return (
+            (k(unflatten_view_tree(flat)) == nested()) &
+            (k(list(flat.parent)) == [-1, 0, 1, 1, 3, 3, 0, 6, 0])
+        )
+
+    def find(self) -> Expectation:
+        flat = flatten_view_tree(nested())
+        index = flat_pane_index(flat, StrIdent('three'))
+        return (
+            (k(index) == Just(5)) &
+            (k(index.map(lambda a: flat_path(flat, a))) == Just(List(0, 1, 3))) &
+            (k(flat_pane_index(flat, StrIdent('sub'))) == Nothing)
+        )
+
+    def measure(self) -> Expectation:
+        tree = ui_open_panes(List('one', 'three', 'five'))(nested()).get_or_raise()
+        flat = flatten_view_tree(tree)
+        sizes = measure_flat_tree(P=SimplePane, L=SimpleLayout)(flat, 300, 120)
+        expected = measure_view_tree(P=SimplePane, L=SimpleLayout)(tree, 300, 120, MeasureCache(10))
+        return k(flat_measure_tree(flat, sizes)) == expected
+
+    def deep(self) -> Expectation:
+        flat = flatten_view_tree(deep(5000))
+        sizes = measure_flat_tree(P=SimplePane, L=SimpleLayout)(flat, 300, 120)
+        return k(sizes.last) == Just(Just(120))
+
+
+__all__ = ('FlatTreeSpec',)
@@ -0,0 +1,59 @@
+from kallikrein import k, Expectation
+from kallikrein.matchers.either import be_right, be_left
+
+from amino import List, Right
+
+from chiasma.test.tmux_spec import TmuxSpec
+from chiasma.io.compute import TmuxIO
+from chiasma.commands.pane import pane, pane_open, window_pane_open, pane_from_loc, PaneLoc, window_panes
+from chiasma.commands.window import window, session_window
+from chiasma.commands.session import session_exists
+from chiasma.commands.layout import window_layout, layout_pane_cells
+
+
+class LookupSpec(TmuxSpec):
+    '''
+    query single panes $pane
+    query single windows $window
+    query sessions $session
+    query the layout of a window $layout
+    '''
+
+    def pane(self) -> Expectation:
+        TmuxIO.write('split-window').unsafe(self.tmux)
+        p = pane(1).unsafe(self.tmux)
+        open = TmuxIO.traverse_par(List(pane_open(1), pane_open(5), window_pane_open(0, 1), window_pane_open(1, 1)),
+                                   lambda a: a).unsafe(self.tmux)
+        loc = pane_from_loc(PaneLoc(1, 1)).unsafe(self.tmux)
+        return (
+            (k(p.id) == 1) &
+            (k(p.window_id) == 0) &
+            (k(open) == List(True, False, True, False)) &
+            k(loc).must(be_left) &
+            k(pane(5).either(self.tmux)).must(be_left)
+        )
+
+    def window(self) -> Expectation:
+        return (
+            k(window(0).unsafe(self.tmux)).must(be_right) &
+            k(window(1).unsafe(self.tmux)).must(be_left) &
+            k(session_window(0, 0).unsafe(self.tmux)).must(be_right) &
+            k(session_window(1, 0).unsafe(self.tmux)).must(be_left)
+        )
+
+    def session(self) -> Expectation:
+        return k(TmuxIO.par(List(session_exists(0), session_exists(1))).unsafe(self.tmux)) == List(True, False)
+
+    def layout(self) -> Expectation:
+        TmuxIO.write('split-window', '-h').unsafe(self.tmux)
+        TmuxIO.write('split-window', '-v').unsafe(self.tmux)
+        layout = window_layout(0).unsafe(self.tmux)
+        panes = window_panes(0).unsafe(self.tmux)
+        cells = layout.map(lambda a: layout_pane_cells()(a).map(lambda c: (c.id, c.geometry.width, c.geometry.height)))
+        return (
+            (k(cells) == Right(panes.map(lambda a: (a.id, a.width, a.height)))) &
+            k(window_layout(1).unsafe(self.tmux)).must(be_left)
+        )
+
+
+__all__ = ('LookupSpec',)
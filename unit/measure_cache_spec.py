@@ -0,0 +1,67 @@
+from kallikrein import k, Expectation
+
+from amino.test.spec import SpecBase
+from amino import List
+from amino.boolean import false
+
+from chiasma.data.view_tree import ViewTree, map_panes
+from chiasma.ui.simple import SimpleLayout, SimplePane, has_ident
+from chiasma.window.measure import measure_view_tree, MeasureCache, measure_keys
+
+from unit._support.layout import open_all_panes
+
+
+def wide_layout():
+    def sub(name: str) -> ViewTree:
+        return ViewTree.layout(
+            SimpleLayout.cons(name, vertical=True),
+            List(ViewTree.pane(SimplePane.cons(f'{name}_one')), ViewTree.pane(SimplePane.cons(f'{name}_two'))),
+        )
+    return open_all_panes(ViewTree.layout(SimpleLayout.cons('main', vertical=False), List(sub('left'), sub('right'))))
+
+
+def measure(layout: ViewTree, width: int, height: int, cache: MeasureCache) -> ViewTree:
+    return measure_view_tree(P=SimplePane, L=SimpleLayout)(layout, width, height, cache)
+
+
+close_right_two = map_panes(has_ident('right_two'), lambda a: a.set.open(false))
+
+
+class MeasureCacheSpec(SpecBase):
+    '''
+    reuse the measurements of an unchanged tree $unchanged
+    remeasure only the subtree that changed $changed
+    evict the least recently used subtree $evict
+    key the cache by the structure of the subtrees $structure
+    '''
+
+    def unchanged(self) -> Expectation:
+        cache = MeasureCache(10)
+        layout = wide_layout()
+        first = measure(layout, 100, 40, cache)
+        second = measure(layout, 100, 40, cache)
+        return (k(second) == first) & (k(cache.hits) == 1)
+
+    def changed(self) -> Expectation:
+        cache = MeasureCache(10)
+        measure(wide_layout(), 100, 40, cache)
+        updated = close_right_two(wide_layout())
+        cached = measure(updated, 100, 40, cache)
+        return (k(cached) == measure(updated, 100, 40, MeasureCache(10))) & (k(cache.hits) == 1)
+
+    def evict(self) -> Expectation:
+        cache = MeasureCache(3)
+        layout = wide_layout()
+        measure(layout, 100, 40, cache)
+        measure(layout, 101, 40, cache)
+        return k(len(cache.trees)) == 3
+
+    def structure(self) -> Expectation:
+        cache = MeasureCache(10)
+        layout = wide_layout()
+        measure(layout, 100, 40, cache)
+        key = measure_keys(P=SimplePane)()(layout)
+        return k((key.data.structure, 100, 40) in cache.trees).true
+
+
+__all__ = ('MeasureCacheSpec',)
@@ -0,0 +1,53 @@
+import random
+from typing import Tuple
+
+from kallikrein import k, Expectation
+
+from amino.test.spec import SpecBase
+from amino import List, Just, Nothing
+
+from chiasma.window.measure import balance_sizes, normalize_weights
+from chiasma.window.measure_numpy import balance_sizes_numpy
+
+
+def random_views(rand: random.Random, count: int) -> Tuple:
+    min_s = List(*[rand.choice([0, 0.1, 0.3, 2, 5, 10]) for i in range(count)])
+    max_s = min_s.map(lambda a: rand.choice([Nothing, Just(a + rand.choice([0.2, 1, 3, 10.5, 40]))]))
+    minimized = List(*[rand.random() < 0.2 for i in range(count)])
+    weights = normalize_weights(minimized.map(lambda a: 0 if a else rand.choice([0, 0.5, 1, 2])))
+    total = rand.choice([count * 2 + 1, count * 5, count * 10, count * 100]) - (count - 1)
+    return min_s, max_s, weights, minimized, total
+
+
+def balance(f, views: Tuple) -> List[int]:
+    try:
+        return f(*views)
+    except ZeroDivisionError:
+        return Nothing
+
+
+class MeasureNumpySpec(SpecBase):
+    '''
+    cut $cut
+    distribute on unbounded $unbounded
+    same cells as the pure implementation for random layouts $random_layouts
+    '''
+
+    def cut(self) -> Expectation:
+        r = balance_sizes_numpy(List(10, 20, 40), List(Nothing, Nothing, Nothing), List(0.2, 0.4, 0.4),
+                                List(False, False, False), 50)
+        return k(r) == List(2, 14, 34)
+
+    def unbounded(self) -> Expectation:
+        r = balance_sizes_numpy(List(0, 0, 5), List(Just(10), Just(10), Nothing), List(1 / 3, 1 / 3, 1 / 3),
+                                List(False, False, False), 50)
+        return k(r) == List(10, 10, 30)
+
+    def random_layouts(self) -> Expectation:
+        rand = random.Random(1)
+        layouts = List(*[random_views(rand, rand.randint(1, 300 if i % 10 == 0 else 30)) for i in range(2000)])
+        mismatches = layouts.filter(lambda a: balance(balance_sizes, a) != balance(balance_sizes_numpy, a))
+        return k(mismatches) == List()
+
+
+__all__ = ('MeasureNumpySpec',)
@@ -0,0 +1,49 @@
+from kallikrein import k, Expectation
+
+from amino.test.spec import SpecBase
+from amino import List, Map, Right, _
+from amino.boolean import false, true
+from amino.lenses.lens import lens
+
+from chiasma.data.view_tree import ViewTree, tree_panes
+from chiasma.mod_pane import mod_panes
+from chiasma.open_pane import ui_open_pane, ui_open_panes
+from chiasma.ui.simple import SimpleLayout, SimplePane
+
+from unit._support.layout import three, open_all_panes
+
+
+def tree() -> ViewTree:
+    return ViewTree.layout(SimpleLayout.cons('root'), List(three, ViewTree.pane(SimplePane.cons('last'))))
+
+
+class ModPanesSpec(SpecBase):
+    '''
+    open several panes like consecutive single updates $open
+    apply different updates $different
+    share subtrees without updated panes $share
+    fail if a pane is missing $missing
+    '''
+
+    def open(self) -> Expectation:
+        expected = ui_open_pane('three')(tree()).flat_map(ui_open_pane('last'))
+        return k(ui_open_panes(List('three', 'last'))(tree())) == expected
+
+    def different(self) -> Expectation:
+        updated = mod_panes(Map(one=lens.data.open.set(false), last=lens.data.pin.set(true)))(open_all_panes(tree()))
+        panes = updated.map(tree_panes())
+        return (
+            (k(panes.map(lambda a: a.map(_.open))) == Right(List(false, true, true, true))) &
+            (k(panes.map(lambda a: a.map(_.pin))) == Right(List(false, true, false, true)))
+        )
+
+    def share(self) -> Expectation:
+        initial = tree()
+        updated = ui_open_panes(List('last'))(initial).get_or_raise()
+        return (k(updated.sub[0] is initial.sub[0]).true) & (k(updated.sub[1].data.open).true)
+
+    def missing(self) -> Expectation:
+        return k(ui_open_panes(List('three', 'missing'))(tree()).is_left).true
+
+
+__all__ = ('ModPanesSpec',)
@@ -0,0 +1,46 @@
+from kallikrein import k, Expectation
+
+from amino.test.spec import SpecBase
+from amino import List, Right, Nil
+
+from chiasma.data.tmux import Views
+from chiasma.data.pane import Pane
+from chiasma.data.view_tree import ViewTree
+from chiasma.io.data import TSuccess
+from chiasma.io.state import TS
+from chiasma.pane import reference_pane, pack_pane
+from chiasma.ui.simple import SimpleLayout, SimplePane
+from chiasma.window.measure import MeasuredView, Measures
+
+from unit._support.tmux import RecordTmux
+
+views = Views.cons(panes=List(Pane.cons('one', 1), Pane.cons('two', 2), Pane.cons('three')))
+one, two, three = SimplePane.cons('one', open=True), SimplePane.cons('two', open=True), SimplePane.cons('three')
+
+
+def measured_layout(*panes: SimplePane) -> ViewTree:
+    return ViewTree.layout(
+        MeasuredView(SimpleLayout.cons('main'), Measures(10)),
+        List(*panes).map(lambda a: ViewTree.pane(MeasuredView(a, Measures(5)))),
+    )
+
+
+class PackSpec(SpecBase):
+    '''
+    find the reference pane of a layout without queries $reference
+    move only live panes without queries $move
+    '''
+
+    def reference(self) -> Expectation:
+        tmux = RecordTmux()
+        result = reference_pane(measured_layout(three, one, two), List(2)).run_a(views).run(tmux)
+        return (k(result) == TSuccess(Right(two))) & (k(tmux.batches) == Nil)
+
+    def move(self) -> Expectation:
+        tmux = RecordTmux()
+        moves = List((one, two, List(2)), (two, one, List(1, 2)))
+        moves.traverse(lambda a: pack_pane(a[0], a[1], True, a[2]), TS).run_a(views).run(tmux)
+        return k(tmux.batches) == List(List('move-pane'))
+
+
+__all__ = ('PackSpec',)
@@ -0,0 +1,66 @@
+from kallikrein import k, Expectation
+
+from amino.test.spec import SpecBase
+from amino import List, do, Do
+
+from chiasma.io.compute import TmuxIO
+from chiasma.io.data import TSuccess, TError
+
+from unit._support.tmux import RecordTmux
+
+
+@do(TmuxIO[List[str]])
+def two_reads(name: str) -> Do:
+    a = yield TmuxIO.read(f'{name}-1')
+    b = yield TmuxIO.read(f'{name}-2')
+    return a + b
+
+
+@do(TmuxIO[List[List[str]]])
+def with_writes() -> Do:
+    yield TmuxIO.write('w')
+    yield TmuxIO.par(List(TmuxIO.read('a'), TmuxIO.read('b')))
+
+
+class ParSpec(SpecBase):
+    '''
+    send independent reads in one batch $reads
+    advance branches in lockstep $lockstep
+    send pending writes with the first batch $writes
+    fail if a branch fails $error
+    send pending writes if there are no branches $empty
+    '''
+
+    def reads(self) -> Expectation:
+        tmux = RecordTmux()
+        result = TmuxIO.traverse_par(List('a', 'b', 'c'), TmuxIO.read).run(tmux)
+        return (
+            (k(result) == TSuccess(List(List('a'), List('b'), List('c')))) &
+            (k(tmux.batches) == List(List('a', 'b', 'c')))
+        )
+
+    def lockstep(self) -> Expectation:
+        tmux = RecordTmux()
+        result = TmuxIO.traverse_par(List('a', 'b'), two_reads).run(tmux)
+        return (
+            (k(result) == TSuccess(List(List('a-1', 'a-2'), List('b-1', 'b-2')))) &
+            (k(tmux.batches) == List(List('a-1', 'b-1'), List('a-2', 'b-2')))
+        )
+
+    def writes(self) -> Expectation:
+        tmux = RecordTmux()
+        with_writes().run(tmux)
+        return k(tmux.batches) == List(List('w', 'a', 'b'))
+
+    def error(self) -> Expectation:
+        tmux = RecordTmux()
+        result = TmuxIO.traverse_par(List('a', 'fail'), TmuxIO.read).run(tmux)
+        return k(isinstance(result, TError)).true
+
+    def empty(self) -> Expectation:
+        tmux = RecordTmux()
+        result = TmuxIO.write('w').flat_map(lambda a: TmuxIO.traverse_par(List(), TmuxIO.read)).run(tmux)
+        return (k(result) == TSuccess(List())) & (k(tmux.batches) == List(List('w')))
+
+
+__all__ = ('ParSpec',)
@@ -0,0 +1,65 @@
+from kallikrein import k, Expectation
+
+from amino.test.spec import SpecBase
+from amino import List, Lists, Nil
+
+from chiasma.tmux import CmdOutputParser, PSuccess, PError, correlate_blocks, TmuxCmdSuccess, TmuxCmdError, TmuxCmd
+
+output = b'''%begin 1 10 0
+%end 1 10 0
+%session-changed $0 main
+%begin 2 11 1
+%0 80 24
+%end 1 10 1
+%end 2 11 1
+%begin 3 12 1
+parse error: unknown command: foo
+%error 3 12 1
+'''
+
+duplicate = b'''%begin 2 11 1
+%0 80 24
+%end 2 11 1
+%begin 4 13 0
+%1 80 24
+%end 4 13 0
+'''
+
+
+class ParseSpec(SpecBase):
+    '''
+    parse output fed in single bytes $chunks
+    assign blocks to commands by command number $correlate
+    parse a long line fed in many chunks $long_line
+    '''
+
+    def chunks(self) -> Expectation:
+        parser = CmdOutputParser()
+        blocks = Lists.range(len(output)).flat_map(lambda i: parser.feed(output[i:i + 1]))
+        return (
+            (k(blocks.map(lambda a: a.output)) == List(
+                PSuccess(List()),
+                PSuccess(List('%0 80 24', '%end 1 10 1')),
+                PError(List('parse error: unknown command: foo')),
+            )) &
+            (k(blocks.map(lambda a: a.number)) == List(10, 11, 12)) &
+            (k(blocks.map(lambda a: a.client)) == List(False, True, True))
+        )
+
+    def correlate(self) -> Expectation:
+        cmds = List(TmuxCmd('list-panes', Nil), TmuxCmd('foo', Nil))
+        results = correlate_blocks(cmds, CmdOutputParser().feed(output + duplicate))
+        return k(results) == List(
+            TmuxCmdSuccess(cmds[0], PSuccess(List('%0 80 24', '%end 1 10 1'))),
+            TmuxCmdError(cmds[1], PError(List('parse error: unknown command: foo'))),
+        )
+
+    def long_line(self) -> Expectation:
+        line = b'x' * 100000
+        data = b'%begin 1 10 1\n' + line + b'\n%end 1 10 1\n'
+        parser = CmdOutputParser()
+        blocks = Lists.range(0, len(data), 7).flat_map(lambda i: parser.feed(data[i:i + 7]))
+        return k(blocks.map(lambda a: a.output)) == List(PSuccess(List(line.decode())))
+
+
+__all__ = ('ParseSpec',)
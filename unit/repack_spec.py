@@ -0,0 +1,109 @@
+from kallikrein import k, Expectation
+from kallikrein.matchers.length import have_length
+
+from amino import List, do, Do, Nil
+from amino.boolean import true, false
+from amino.lenses.lens import lens
+
+from chiasma.commands.pane import all_panes, PaneData
+from chiasma.data.view_tree import map_layouts, map_panes
+from chiasma.ui.simple import has_ident
+from chiasma.test.tmux_spec import TmuxSpec
+from chiasma.io.state import TS
+from chiasma.util.id import StrIdent
+
+from unit._support.data import SpecData, ui_open_simple_pane, simple_render, pane_geo
+from unit._support.layout import three
+from unit._support.tmux import LogTmux
+
+
+@do(TS[SpecData, None])
+def open_panes(*names: str) -> Do:
+    yield List(*names).traverse(lambda a: ui_open_simple_pane(StrIdent(a)), TS)
+    yield simple_render()
+
+
+class RepackSpec(TmuxSpec):
+    '''
+    don't send layout commands when rendering an unchanged layout $unchanged
+    arrange the panes with one command when opening a pane in a sublayout $open_pane
+    arrange the panes with one command when minimizing a layout $minimize
+    create all missing panes in one batch $create
+    skip rendering an unchanged layout after one batch of queries $skip
+    don't send layout commands when packing an unchanged layout $intact
+    close a pane when no pane is missing $close
+    '''
+
+    def setup(self) -> None:
+        super().setup()
+        self.tmux = LogTmux(self.tmux)
+
+    def render_again(self, initial: TS[SpecData, None], prog: TS[SpecData, List[PaneData]]) -> List[PaneData]:
+        s, r = self.run(initial, SpecData.cons(three))
+        self.tmux.cmds = Nil
+        self.tmux.batches = Nil
+        return self.run(prog, s)[1]
+
+    def unchanged(self) -> Expectation:
+        self.render_again(open_panes('one', 'two'), simple_render())
+        return (
+            (k(self.tmux.count('move-pane')) == 0) &
+            (k(self.tmux.count('resize-pane')) == 0) &
+            (k(self.tmux.count('select-layout')) == 0)
+        )
+
+    def open_pane(self) -> Expectation:
+        @do(TS[SpecData, None])
+        def go() -> Do:
+            yield ui_open_simple_pane(StrIdent('three'))
+            yield simple_render()
+            yield all_panes().state
+        panes = self.render_again(open_panes('one', 'two'), go())
+        return (
+            (k(self.tmux.count('move-pane')) == 0) &
+            (k(self.tmux.count('select-layout')) == 1) &
+            (k(panes.map(pane_geo)) == List((150, 119, 0), (149, 59, 0), (149, 59, 60)))
+        )
+
+    def minimize(self) -> Expectation:
+        @do(TS[SpecData, None])
+        def go() -> Do:
+            yield TS.modify(lens.layout.modify(map_layouts(has_ident('sub'), lens.state.minimized.set(true))))
+            yield simple_render()
+            yield all_panes().state
+        panes = self.render_again(open_panes('one', 'two', 'three'), go())
+        return (
+            (k(self.tmux.count('move-pane')) == 0) &
+            (k(self.tmux.count('select-layout')) == 1) &
+            (k(panes[1:].map(lambda a: a.width)) == List(2, 2))
+        )
+
+    def create(self) -> Expectation:
+        self.run(open_panes('one', 'two', 'three'), SpecData.cons(three))
+        splits = self.tmux.batches.map(lambda a: a.filter(lambda c: c == 'split-window').length).filter(lambda a: a > 0)
+        return k(splits) == List(2)
+
+    def skip(self) -> Expectation:
+        self.render_again(open_panes('one', 'two'), simple_render())
+        return k(self.tmux.batches) == List(List('display-message', 'list-panes'), List('display-panes'))
+
+    def intact(self) -> Expectation:
+        self.render_again(open_panes('one', 'two'), simple_render(True))
+        return (
+            (k(self.tmux.count('split-window')) == 0) &
+            (k(self.tmux.count('move-pane')) == 0) &
+            (k(self.tmux.count('resize-pane')) == 0) &
+            (k(self.tmux.count('select-layout')) == 0)
+        )
+
+    def close(self) -> Expectation:
+        @do(TS[SpecData, None])
+        def go() -> Do:
+            yield TS.modify(lens.layout.modify(map_panes(has_ident('three'), lens.open.set(false))))
+            yield simple_render()
+            yield all_panes().state
+        panes = self.render_again(open_panes('one', 'three'), go())
+        return k(panes).must(have_length(2))
+
+
+__all__ = ('RepackSpec',)
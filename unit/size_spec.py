@@ -3,7 +3,7 @@ from kallikrein import k, Expectation
 from amino.test.spec import SpecBase
 from amino import List, Just, Nothing
 
-from chiasma.window.measure import balance_sizes
+from chiasma.window.measure import balance_sizes, saturate
 
 
 class SizeSpec(SpecBase):
@@ -13,6 +13,9 @@ class SizeSpec(SpecBase):
     distribute on equally bounded $equal
     cut $cut
     don't grow minimized panes $minimized
+    fill views up to their maximum $saturate
+    round sizes to cells that add up to the total $rounding
+    take the cells of small views from large views $small
     '''
 
     def unbounded(self) -> Expectation:
@@ -39,5 +42,19 @@ class SizeSpec(SpecBase):
         r = balance_sizes(List(10, 2), List(Just(10), Just(2)), List(.5, .5), List(False, True), 50)
         return k(r) == List(48, 2)
 
+    def saturate(self) -> Expectation:
+        r = saturate(List(0, 5, 0, 0), List(10, 20, 100, 4), List(.25, .25, .5, 0), 90)
+        return k(r) == List(10, 20, 60, 0)
+
+    def rounding(self) -> Expectation:
+        r = balance_sizes(List(0, 0, 0), List(Nothing, Nothing, Nothing), List(1 / 3, 1 / 3, 1 / 3),
+                          List(False, False, False), 100)
+        return k(r) == List(34, 33, 33)
+
+    def small(self) -> Expectation:
+        r = balance_sizes(List(0, 0, 0), List(Nothing, Nothing, Nothing), List(0.01, 0.01, 0.98),
+                          List(False, False, False), 50)
+        return k(r) == List(2, 2, 46)
+
 
 __all__ = ('SizeSpec',)
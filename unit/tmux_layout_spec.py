@@ -0,0 +1,90 @@
+from kallikrein import k, Expectation
+
+from amino.test.spec import SpecBase
+from amino import List, Map, Right
+
+from chiasma.data.view_tree import ViewTree
+from chiasma.ui.simple import SimpleLayout, SimplePane
+from chiasma.window.measure import MeasuredView, Measures
+from chiasma.window.tmux_layout import tmux_layout, pane_swaps, layout_pane_ids
+from chiasma.commands.layout import layout_checksum, parse_window_layout, CellGeometry, LayoutCell, PaneCell
+from chiasma.util.id import StrIdent
+
+
+def measured_layout(name: str, vertical: bool, size: int, sub: List[ViewTree]) -> ViewTree:
+    return ViewTree.layout(MeasuredView(SimpleLayout.cons(name, vertical=vertical), Measures(size)), sub)
+
+
+def measured_pane(name: str, size: int) -> ViewTree:
+    return ViewTree.pane(MeasuredView(SimplePane.cons(name), Measures(size)))
+
+
+def tree(sub_size: int) -> ViewTree:
+    return measured_layout('main', False, 300, List(
+        measured_pane('one', 149),
+        measured_layout('sub', True, 150, List(
+            measured_pane('two', sub_size),
+            measured_pane('three', sub_size),
+        )),
+    ))
+
+
+pane_ids = Map({StrIdent('one'): 4, StrIdent('two'): 2, StrIdent('three'): 7})
+
+
+class TmuxLayoutSpec(SpecBase):
+    '''
+    layout checksum $checksum
+    layout string for a measured tree $layout
+    fill the layout when the sizes are rounded $rounding
+    swap panes into the order of the layout cells $swaps
+    fail if the window panes differ from the layout $mismatch
+    parse a window layout $parse
+    reject a window layout with an invalid checksum $checksum_mismatch
+    parse a window layout with many sibling cells $many_cells
+    '''
+
+    def checksum(self) -> Expectation:
+        return k(layout_checksum('159x48,0,0{79x48,0,0,79x48,80,0}')) == 'bb62'
+
+    def layout(self) -> Expectation:
+        return k(tmux_layout(tree(59), 300, 119, pane_ids)) == Right(
+            'adae,300x119,0,0{149x119,0,0,4,150x119,150,0[150x59,150,0,2,150x59,150,60,7]}'
+        )
+
+    def rounding(self) -> Expectation:
+        return k(tmux_layout(tree(60), 300, 119, pane_ids).map(lambda a: a[5:])) == Right(
+            '300x119,0,0{149x119,0,0,4,150x119,150,0[150x60,150,0,2,150x58,150,61,7]}'
+        )
+
+    def swaps(self) -> Expectation:
+        wanted = layout_pane_ids(tree(59), pane_ids)
+        return k(wanted.flat_map(lambda a: pane_swaps(List(2, 4, 7), a))) == Right(List((4, 2)))
+
+    def mismatch(self) -> Expectation:
+        return k(pane_swaps(List(2, 4, 7, 8), List(4, 2, 7)).is_left).true
+
+    def parse(self) -> Expectation:
+        layout = tmux_layout(tree(59), 300, 119, pane_ids).get_or_raise()
+        return k(parse_window_layout(layout)) == Right(
+            ViewTree.layout(LayoutCell(CellGeometry(300, 119, 0, 0), False), List(
+                ViewTree.pane(PaneCell(CellGeometry(149, 119, 0, 0), 4)),
+                ViewTree.layout(LayoutCell(CellGeometry(150, 119, 150, 0), True), List(
+                    ViewTree.pane(PaneCell(CellGeometry(150, 59, 150, 0), 2)),
+                    ViewTree.pane(PaneCell(CellGeometry(150, 59, 150, 60), 7)),
+                )),
+            ))
+        )
+
+    def checksum_mismatch(self) -> Expectation:
+        return k(parse_window_layout('0000,159x48,0,0{79x48,0,0,1,79x48,80,0,2}').is_left).true
+
+    def many_cells(self) -> Expectation:
+        count = 1000
+        cells = ','.join(f'1x48,{2 * i},0,{i}' for i in range(count))
+        description = f'{2 * count - 1}x48,0,0{{{cells}}}'
+        layout = parse_window_layout(f'{layout_checksum(description)},{description}')
+        return k(layout.map(lambda a: a.sub.map(lambda c: c.data.id))) == Right(List.range(count))
+
+
+__all__ = ('TmuxLayoutSpec',)
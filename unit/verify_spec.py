@@ -0,0 +1,64 @@
+from kallikrein import k, Expectation
+
+from amino import List, do, Do, Just, Nothing, Nil
+
+from chiasma.commands.pane import all_panes, PaneData
+from chiasma.commands.layout import CellGeometry, PaneCell, LayoutCell
+from chiasma.data.view_tree import ViewTree
+from chiasma.test.tmux_spec import TmuxSpec
+from chiasma.io.compute import TmuxIO
+from chiasma.io.state import TS
+from chiasma.util.id import StrIdent
+from chiasma.window.verify import pane_deviations, PaneDeviation
+
+from unit._support.data import SpecData, ui_open_simple_pane, simple_render, pane_geo
+from unit._support.layout import three
+from unit._support.tmux import LogTmux
+
+
+def cells(*panes: PaneCell) -> ViewTree:
+    return ViewTree.layout(LayoutCell(CellGeometry(100, 50, 0, 0), False), List(*panes).map(ViewTree.pane))
+
+
+class VerifySpec(TmuxSpec):
+    '''
+    report panes that deviate from the expected geometry $deviations
+    resize deviating panes after rendering $correct
+    '''
+
+    def setup(self) -> None:
+        super().setup()
+        self.tmux = LogTmux(self.tmux)
+
+    def deviations(self) -> Expectation:
+        left = PaneCell(CellGeometry(49, 50, 0, 0), 1)
+        right = PaneCell(CellGeometry(50, 50, 50, 0), 2)
+        missing = PaneCell(CellGeometry(10, 50, 90, 0), 3)
+        actual_left = PaneCell(CellGeometry(39, 50, 0, 0), 1)
+        return k(pane_deviations(cells(left, right, missing), cells(actual_left, right))) == List(
+            PaneDeviation(1, left.geometry, Just(actual_left.geometry)),
+            PaneDeviation(3, missing.geometry, Nothing),
+        )
+
+    def correct(self) -> Expectation:
+        @do(TS[SpecData, List[PaneData]])
+        def initial() -> Do:
+            yield List('one', 'two', 'three').traverse(lambda a: ui_open_simple_pane(StrIdent(a)), TS)
+            yield simple_render()
+            yield all_panes().state
+        s, panes = self.run(initial(), SpecData.cons(three))
+        TmuxIO.write('resize-pane', '-t', '%0', '-x', '100').unsafe(self.tmux)
+        self.tmux.cmds = Nil
+        @do(TS[SpecData, List[PaneData]])
+        def verify() -> Do:
+            yield simple_render(True)
+            yield all_panes().state
+        s, verified = self.run(verify(), s)
+        return (
+            (k(verified.map(pane_geo)) == panes.map(pane_geo)) &
+            (k(self.tmux.count('select-layout')) == 0) &
+            k(self.tmux.count('resize-pane') > 0).true
+        )
+
+
+__all__ = ('VerifySpec',)
@@ -0,0 +1,49 @@
+from kallikrein import k, Expectation
+
+from amino.test.spec import SpecBase
+from amino import Map
+from amino.boolean import true
+from amino.lenses.lens import lens
+
+from chiasma.data.view_tree import map_panes, tree_hash
+from chiasma.ui.simple import has_ident, SimplePane, SimpleLayout
+
+from unit._support.layout import three
+
+open_pane = lens.open.set(true)
+simple_tree_hash = tree_hash(P=SimplePane, L=SimpleLayout)
+
+
+class ViewTreeSpec(SpecBase):
+    '''
+    return the original tree if no pane matches $unchanged
+    share the subtrees that don't contain an updated pane $share
+    hash the content of a tree $hash
+    hash a tree with unhashable view data $unhashable
+    '''
+
+    def unchanged(self) -> Expectation:
+        return k(map_panes(has_ident('missing'), open_pane)(three) is three).true
+
+    def share(self) -> Expectation:
+        updated = map_panes(has_ident('three'), open_pane)(three)
+        return (
+            (k(updated.sub[0] is three.sub[0]).true) &
+            (k(updated.sub[1].sub[0] is three.sub[1].sub[0]).true) &
+            (k(updated.sub[1].sub[1].data.open).true)
+        )
+
+    def hash(self) -> Expectation:
+        updated = map_panes(has_ident('three'), open_pane)(three)
+        return (
+            (k(simple_tree_hash(three)) == simple_tree_hash(map_panes(has_ident('missing'), open_pane)(three))) &
+            (k(simple_tree_hash(updated)) != simple_tree_hash(three)) &
+            (k(simple_tree_hash(updated.sub[0])) == simple_tree_hash(three.sub[0]))
+        )
+
+    def unhashable(self) -> Expectation:
+        updated = map_panes(has_ident('three'), lambda a: a.set.cwd(Map()))(three)
+        return k(simple_tree_hash(updated)) == simple_tree_hash(three)
+
+
+__all__ = ('ViewTreeSpec',)
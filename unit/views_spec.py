@@ -0,0 +1,53 @@
+from kallikrein import k, Expectation
+from kallikrein.matchers.either import be_left
+
+from amino.test.spec import SpecBase
+from amino import List, Right
+
+from chiasma.data.tmux import Views
+from chiasma.data.pane import Pane
+from chiasma.data.session import Session
+from chiasma.util.id import StrIdent
+
+
+class ViewsSpec(SpecBase):
+    '''
+    look up panes by ident and tmux id $pane
+    update the tmux id of a pane $set_pane_id
+    update a session $session
+    keep the tmux id of another pane in the index $id_conflict
+    '''
+
+    def pane(self) -> Expectation:
+        views = Views.cons(panes=List(Pane.cons('one', 1), Pane.cons('two'))).add_pane(Pane.cons('three', 3))
+        return (
+            (k(views.pane_by_ident(StrIdent('two'))) == Right(Pane.cons('two'))) &
+            (k(views.pane_by_id(3)) == Right(Pane.cons('three', 3))) &
+            k(views.pane_by_ident(StrIdent('four'))).must(be_left)
+        )
+
+    def set_pane_id(self) -> Expectation:
+        views = Views.cons(panes=List(Pane.cons('one', 1), Pane.cons('two')))
+        updated = views.set_pane_id(Pane.cons('one', 1), 5).set_pane_id(Pane.cons('two'), 1)
+        return (
+            (k(updated.pane_by_id(5)) == Right(Pane.cons('one', 5))) &
+            (k(updated.pane_by_id(1)) == Right(Pane.cons('two', 1))) &
+            (k(updated.panes) == List(Pane.cons('one', 5), Pane.cons('two', 1)))
+        )
+
+    def session(self) -> Expectation:
+        views = Views.cons(sessions=List(Session.cons('main'), Session.cons('other')))
+        updated = views.update_session(Session.cons('other', 2)).update_session(Session.cons('missing', 3))
+        return k(updated.sessions) == List(Session.cons('main'), Session.cons('other', 2))
+
+    def id_conflict(self) -> Expectation:
+        views = Views.cons(panes=List(Pane.cons('one', 1), Pane.cons('two', 2)))
+        updated = views.set_pane_id(Pane.cons('two', 2), 1).set_pane_id(Pane.cons('two', 1), 3)
+        return (
+            (k(updated.pane_by_id(1)) == Right(Pane.cons('one', 1))) &
+            (k(updated.pane_by_id(3)) == Right(Pane.cons('two', 3))) &
+            k(updated.pane_by_id(2)).must(be_left)
+        )
+
+
+__all__ = ('ViewsSpec',)
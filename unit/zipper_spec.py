@@ -0,0 +1,66 @@
+from kallikrein import k, Expectation
+
+from amino.test.spec import SpecBase
+from amino import List, Just, Right
+from amino.boolean import true
+
+from chiasma.data.view_tree import ViewTree
+from chiasma.data.zipper import ViewTreeZipper, path_index, view_tree_index, indexed_pane
+from chiasma.mod_pane import mod_pane
+from chiasma.open_pane import ui_open_pane, mod_pane_open, pane_node_open, pane_open_layout_hook
+from chiasma.ui.simple import SimpleLayout, SimplePane
+from chiasma.util.id import StrIdent
+
+from unit._support.layout import three
+
+
+def wide_tree() -> ViewTree:
+    return ViewTree.layout(
+        SimpleLayout.cons('root'),
+        List(ViewTree.pane(SimplePane.cons('first'))).cat(three).cat(ViewTree.pane(SimplePane.cons('last'))),
+    )
+
+
+class ZipperSpec(SpecBase):
+    '''
+    index the paths of views $index
+    share the unchanged subtrees when moving up $share
+    open a pane and its pinned siblings like `mod_pane` $open
+    inherit the path index after an update $inherit
+    fail for an unknown pane $unknown
+    '''
+
+    def index(self) -> Expectation:
+        paths = path_index(wide_tree())
+        return (
+            (k(paths.lift(StrIdent('three'))) == Just(List(1, 1, 1))) &
+            (k(paths.lift(StrIdent('root'))) == Just(List()))
+        )
+
+    def share(self) -> Expectation:
+        tree = wide_tree()
+        zipper = ViewTreeZipper.cons(tree).follow(List(1, 0)).get_or_raise()
+        updated = zipper.modify(pane_node_open.set(true)).root
+        return (
+            (k(updated.sub[2] is tree.sub[2]).true) &
+            (k(updated.sub[1].sub[1] is tree.sub[1].sub[1]).true) &
+            (k(updated.sub[1].sub[0].data.open).true)
+        )
+
+    def open(self) -> Expectation:
+        tree = wide_tree()
+        expected = mod_pane(mod_pane_open('three', pane_node_open.set(true)), pane_open_layout_hook)(tree)
+        return k(ui_open_pane('three')(tree)) == expected
+
+    def inherit(self) -> Expectation:
+        tree = wide_tree()
+        view_tree_index.paths(tree)
+        updated = ui_open_pane('first')(tree).get_or_raise()
+        opened = indexed_pane(updated, StrIdent('first')).map(lambda a: a.open)
+        return (k(view_tree_index.lookup(updated).present).true) & (k(opened) == Right(true))
+
+    def unknown(self) -> Expectation:
+        return k(ui_open_pane('missing')(wide_tree()).is_left).true
+
+
+__all__ = ('ZipperSpec',)